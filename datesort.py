@@ -1,30 +1,141 @@
 #!/usr/bin/env python
-"""Usage: datesort
+"""Usage: datesort [-S SIZE] [-m] [file]...
 
-Sorts lines of stdin based on the date embedded within. A date is any
-substring matching the following regex:
+Sorts lines of stdin (or the files given) based on the date embedded
+within. If a line contains more than one date then the last one is used.
+Lines without a date are sorted to the end. The following dates are
+understood:
 
-    \d\d\d\d\.\d\d\.\d\d
+    2020.01.31                  2020-01-31
+    2020-01-31T13:45:00         2020-01-31 13:45:00.123+01:00
+    Jan 31 13:45:00             (syslog, assumed to be in the current year)
+    1580478300                  (ten digit unix timestamp)
+
+Dates with a timezone and unix timestamps are converted to UTC, all
+other dates are compared as they are written.
+
+Inputs bigger than the buffer size (-S, default 256M) are sorted in
+pieces using temporary files.
+
+With -m the files are assumed to already be sorted by date and are
+merged in a single pass, like `sort -m`.
 """
 
+import argparse
+import datetime
+import heapq
 import re
 import sys
+import time
+
+import extsort
+
+MONTHS = "Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split()
+
+# greedy `.*` makes a single search find the last date in the line
+regex = re.compile(
+    r"""
+    .*(?:
+        (?P<year>\d{4})(?P<sep>[-.])(?P<month>\d\d)(?P=sep)(?P<day>\d\d)
+        (?:[T\ ](?P<hour>\d\d):(?P<minute>\d\d)
+            (?::(?P<second>\d\d)(?:[.,](?P<fraction>\d{1,6})\d*)?)?
+            (?P<zone>Z|[+-]\d\d:?\d\d)?
+        )?
+    |
+        (?P<syslog_month>%s)\ {1,2}(?P<syslog_day>\d{1,2})
+        \ (?P<syslog_time>\d\d:\d\d:\d\d)
+    |
+        \b(?P<epoch>\d{10})(?:\.(?P<epoch_fraction>\d{1,6})\d*)?\b
+    )
+    """ % "|".join(MONTHS),
+    re.VERBOSE,
+)
+
+# sorts after every date, like the old "9999.99.99"
+NO_DATE = 10**21
+
+CURRENT_YEAR = time.localtime().tm_year
+
+
+def pack(year, month, day, hour=0, minute=0, second=0, microsecond=0):
+    "Packs a date into an integer that sorts in the same order."
+    packed = ((year * 100 + month) * 100 + day) * 100 + hour
+    packed = (packed * 100 + minute) * 100 + second
+    return packed * 1000000 + microsecond
 
-regex = re.compile(r"\d\d\d\d\.\d\d\.\d\d")
+
+def microseconds(fraction):
+    return int(fraction.ljust(6, "0")) if fraction else 0
+
+
+def parse_zone(zone):
+    if zone == "Z":
+        return datetime.timezone.utc
+    zone = zone.replace(":", "")
+    offset = datetime.timedelta(hours=int(zone[1:3]), minutes=int(zone[3:5]))
+    return datetime.timezone(-offset if zone[0] == "-" else offset)
+
+
+def match_key(match):
+    "Converts a date match into its integer key."
+    if match["epoch"]:
+        tm = time.gmtime(int(match["epoch"]))
+        micro = microseconds(match["epoch_fraction"])
+        return pack(*tm[:6], micro)
+
+    if match["syslog_month"]:
+        month = MONTHS.index(match["syslog_month"]) + 1
+        hour, minute, second = map(int, match["syslog_time"].split(":"))
+        day = int(match["syslog_day"])
+        return pack(CURRENT_YEAR, month, day, hour, minute, second)
+
+    fields = [
+        int(match[name] or 0)
+        for name in ("year", "month", "day", "hour", "minute", "second")
+    ]
+    micro = microseconds(match["fraction"])
+    if match["zone"]:
+        try:
+            date = datetime.datetime(*fields, micro, parse_zone(match["zone"]))
+        except ValueError:
+            pass
+        else:
+            utc = date.astimezone(datetime.timezone.utc)
+            fields = utc.timetuple()[:6]
+    return pack(*fields, micro)
 
 
 def date_key(line):
-    matches = regex.findall(line)
-    date = matches[-1] if matches else "9999.99.99"
+    match = regex.match(line)
+    date = match_key(match) if match else NO_DATE
     return date, line
 
 
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "-S",
+        "--buffer-size",
+        type=extsort.parse_size,
+        default=extsort.DEFAULT_BUFFER_SIZE,
+    )
+    parser.add_argument("-m", "--merge", action="store_true")
+    parser.add_argument("files", nargs="*", type=argparse.FileType("r"))
+    return parser.parse_args(argv[1:])
+
+
 def main(argv):
-    if "-h" in argv or "--help" in argv:
-        return __doc__
+    args = parse_args(argv)
+    files = args.files or [sys.stdin]
 
-    for line in sorted(sys.stdin, key=date_key):
-        sys.stdout.write(line)
+    if args.merge:
+        lines = heapq.merge(*files, key=date_key)
+    else:
+        stream = (line for file in files for line in file)
+        lines = extsort.external_sort(stream, date_key, args.buffer_size)
+    sys.stdout.writelines(lines)
 
 
 if __name__ == "__main__":
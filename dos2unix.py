@@ -1,22 +1,121 @@
 #!/usr/bin/env python
-"""Usage: dos2unix <files>...
+"""Usage: dos2unix [-r] [-j N] <files>...
 
 Converts the files from dos line endings to unix ones.
+
+Files without any dos line endings are left alone, so their modification
+times don't change. Converted files are written to a temporary file which
+then replaces the original, so a file is never left half converted. With
+-r directories are converted recursively, skipping binary files, and
+with -j up to N files are converted at once.
 """
 
+import argparse
+import concurrent.futures
+import mmap
+import os
 import sys
+import tempfile
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def needs_converting(path, skip_binary):
+    """Returns whether a file has dos line endings, and when skip_binary is
+    set, isn't binary. Clean files are only scanned once."""
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            if content.find(b"\r\n") == -1:
+                return False
+            return not skip_binary or content.find(b"\0") == -1
+
+
+def convert_stream(source, dest):
+    "Copies source to dest, converting line endings a block at a time."
+    carry = b""
+    for block in iter(lambda: source.read(BLOCK_SIZE), b""):
+        block = carry + block
+        # a \r at the end may be followed by a \n in the next block
+        if block.endswith(b"\r"):
+            block, carry = block[:-1], b"\r"
+        else:
+            carry = b""
+        dest.write(block.replace(b"\r\n", b"\n"))
+    dest.write(carry)
+
+
+def convert(path):
+    path = os.path.realpath(path)
+    directory, name = os.path.split(path)
+    temp = tempfile.NamedTemporaryFile(
+        dir=directory, prefix="." + name + ".", delete=False
+    )
+    try:
+        with temp, open(path, "rb") as source:
+            convert_stream(source, temp)
+        stat = os.stat(path)
+        os.chmod(temp.name, stat.st_mode & 0o7777)
+        try:
+            os.chown(temp.name, stat.st_uid, stat.st_gid)
+        except PermissionError:
+            pass
+        os.replace(temp.name, path)
+    except BaseException:
+        os.unlink(temp.name)
+        raise
+
+
+def process(path, skip_binary):
+    "Converts a file if it needs it, returning an error message or None."
+    try:
+        if needs_converting(path, skip_binary):
+            convert(path)
+    except OSError as error:
+        return "dos2unix: {}: {}".format(path, error.strerror or error)
+
+
+def find_files(paths, recursive):
+    "Yields (path, found_by_recursing) for the files to convert."
+    for path in paths:
+        if recursive and os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                for name in files:
+                    file = os.path.join(root, name)
+                    if not os.path.islink(file):
+                        yield file, True
+        else:
+            yield path, False
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-r", "--recursive", action="store_true")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("files", nargs="+")
+    return parser.parse_args(argv[1:])
 
 
 def main(argv):
-    if not argv[1:] or "-h" in argv or "--help" in argv:
+    if not argv[1:]:
         return __doc__
+    args = parse_args(argv)
 
-    for file in argv[1:]:
-        with open(file, "rb") as handle:
-            content = handle.read().replace(b"\r\n", b"\n")
-
-        with open(file, "wb") as handle:
-            handle.write(content)
+    failed = False
+    with concurrent.futures.ThreadPoolExecutor(max(args.jobs, 1)) as executor:
+        jobs = [
+            executor.submit(process, path, skip_binary)
+            for path, skip_binary in find_files(args.files, args.recursive)
+        ]
+        for job in jobs:
+            error = job.result()
+            if error:
+                failed = True
+                print(error, file=sys.stderr)
+    return 1 if failed else 0
 
 
 if __name__ == "__main__":
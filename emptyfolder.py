@@ -1,28 +1,101 @@
 #!/usr/bin/env python
 """
 Usage: emptyfolder [folder]
+       emptyfolder -r [--leaves] [-j N] [folder]
 
 Returns 0 if the folder is empty, 1 otherwise. If no folder is passed
 on the command line then the current working directory is used.
+
+With -r every directory under the folder (including itself) that
+contains no files, either directly or in any of its subdirectories, is
+printed instead. With --leaves only the directories that have nothing in
+them at all are printed. Directories are printed deepest first, so the
+output can be given straight to rmdir:
+
+    emptyfolder -r | xargs -d '\\n' rmdir
 """
 
+import argparse
+import concurrent.futures
 import os
-import pathlib
 import sys
 
 
+def is_empty(folder):
+    "Checks for emptiness without listing more than one entry."
+    with os.scandir(folder) as entries:
+        return next(entries, None) is None
+
+
+def scan(path, depth):
+    "Returns the subdirectories of path and whether it holds anything else."
+    subdirs = []
+    has_files = False
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                else:
+                    has_files = True
+    except OSError as error:
+        print("emptyfolder: {}: {}".format(path, error.strerror), file=sys.stderr)
+        has_files = True
+    return path, depth, subdirs, has_files
+
+
+def walk(root, jobs):
+    "Scans every directory under root in parallel, returning {path: scan}."
+    tree = {}
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        pending = {executor.submit(scan, root, 0)}
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for job in done:
+                path, depth, subdirs, has_files = job.result()
+                tree[path] = depth, subdirs, has_files
+                pending.update(
+                    executor.submit(scan, subdir, depth + 1) for subdir in subdirs
+                )
+    return tree
+
+
+def empty_dirs(root, leaves=False, jobs=8):
+    "Yields the empty directories under root, deepest first."
+    tree = walk(root, jobs)
+    # depths come from the walk, as a root like "dir/" or "/" has as many
+    # separators as its children
+    deepest_first = sorted(tree, key=lambda path: (-tree[path][0], path))
+    hollow = {}
+    for path in deepest_first:
+        _, subdirs, has_files = tree[path]
+        if leaves:
+            hollow[path] = not subdirs and not has_files
+        else:
+            hollow[path] = not has_files and all(hollow[subdir] for subdir in subdirs)
+        if hollow[path]:
+            yield path
+
+
 def main(args):
     if "-h" in args or "--help" in args:
         return __doc__
 
-    try:
-        fname = args[1]
-    except IndexError:
-        fname = "."
+    parser = argparse.ArgumentParser(usage=__doc__)
+    parser.add_argument("-r", "--recursive", action="store_true")
+    parser.add_argument("--leaves", action="store_true")
+    parser.add_argument("-j", "--jobs", type=int, default=8)
+    parser.add_argument("folder", nargs="?", default=".")
+    options = parser.parse_args(args[1:])
+
+    if options.recursive:
+        for path in empty_dirs(options.folder, options.leaves, max(options.jobs, 1)):
+            print(path)
+        return
 
-    folder = pathlib.Path(fname).resolve()
-    files = list(folder.iterdir())
-    if files:
+    if not is_empty(options.folder):
         return 1
 
 
@@ -0,0 +1,97 @@
+"""External merge sort shared by datesort, hashsort and keysort.
+
+This is not a command of its own. Lines are sorted in runs of at most
+`buffer_size` bytes. If everything fits in one run it is sorted in
+memory as usual, otherwise each sorted run is spilled to a temporary
+file together with its keys and the runs are merged with `heapq.merge`.
+Both the sort and the merge are stable, so the output is the same as
+`sorted(lines, key=key)`.
+"""
+
+import heapq
+import operator
+import pickle
+import re
+import tempfile
+
+DEFAULT_BUFFER_SIZE = 256 * 1024 * 1024
+
+# number of records pickled together when spilling a run
+RECORDS_PER_PICKLE = 4096
+
+SIZE_SUFFIXES = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+
+def parse_size(string):
+    "Parses a size like `sort -S` does, eg. `500000`, `64K`, `256M`, `2G`."
+    match = re.fullmatch(r"\s*([0-9]+)\s*([kmgt]?)b?\s*", string, re.IGNORECASE)
+    if not match:
+        raise ValueError("invalid buffer size {!r}".format(string))
+    return int(match.group(1)) * SIZE_SUFFIXES[match.group(2).lower()]
+
+
+def chunks(lines, buffer_size):
+    "Groups lines into lists holding roughly buffer_size bytes each."
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield chunk
+            chunk = []
+            size = 0
+    if chunk:
+        yield chunk
+
+
+def sort_run(run, keys):
+    "Sorts a run of lines into a list of (key, line) records."
+    return sorted(zip(keys(run), run), key=operator.itemgetter(0))
+
+
+def spill(records):
+    "Writes records to an anonymous temporary file."
+    file = tempfile.TemporaryFile()
+    for start in range(0, len(records), RECORDS_PER_PICKLE):
+        chunk = records[start : start + RECORDS_PER_PICKLE]
+        pickle.dump(chunk, file, protocol=pickle.HIGHEST_PROTOCOL)
+    file.seek(0)
+    return file
+
+
+def unspill(file):
+    "Reads back the records written by spill, closing the file at the end."
+    with file:
+        while True:
+            try:
+                yield from pickle.load(file)
+            except EOFError:
+                return
+
+
+def external_sort(lines, key=None, buffer_size=DEFAULT_BUFFER_SIZE, keys=None):
+    """Yields lines sorted by key, using temporary files for big inputs.
+
+    Instead of a key function for single lines, `keys` can be a function
+    that takes a list of lines and returns the list of their keys."""
+    if keys is None:
+        key = key if key is not None else (lambda line: line)
+        keys = lambda run: [key(line) for line in run]
+
+    runs = chunks(lines, buffer_size)
+    first = next(runs, None)
+    if first is None:
+        return
+    second = next(runs, None)
+    if second is None:
+        yield from (line for _, line in sort_run(first, keys))
+        return
+
+    files = [spill(sort_run(first, keys)), spill(sort_run(second, keys))]
+    del first, second
+    for run in runs:
+        files.append(spill(sort_run(run, keys)))
+
+    merged = heapq.merge(*map(unspill, files), key=operator.itemgetter(0))
+    yield from (line for _, line in merged)
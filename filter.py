@@ -1,5 +1,6 @@
 #!/usr/bin/env python
-"""Usage: filter <subcommand>...
+"""Usage: filter [--coproc] <subcommand>...
+       filter --py <expression>
 
 This script can filter the contents of stdin by reading it line by
 line and passing that line to a sub-command specified on the command line.
@@ -13,24 +14,133 @@ example finds all the files that are directories (It's a worse version of
     find | filter test -d
 
 Take care to properly escape the sub-command.
+
+Running a new process for every line is slow. With --coproc the
+subcommand is started only once and each line is written to its stdin.
+It must answer every line with exactly one line of output; a line is
+allowed through if the answer is `0` or the line itself and filtered if
+the answer is `1` or anything else:
+
+    find | filter --coproc awk '{ print (length($0) > 40 ? 0 : 1) }'
+
+With --py the expression is compiled once and evaluated in python for
+every line, which is available as the variable `line`. The modules `os`
+and `re` are auto-imported:
+
+    find | filter --py 'os.path.isdir(line)'
 """
 
+import ast
+import os
+import queue
+import re
 import sys
 import shlex
 import subprocess
+import threading
 
 
 def test(command, line):
     cmdline = shlex.split(command)
-    cmdline = cmdline.replace("{}", line) if "{}" in cmdline else cmdline + [line]
+    if "{}" in cmdline:
+        cmdline = [line if arg == "{}" else arg for arg in cmdline]
+    else:
+        cmdline = cmdline + [line]
 
     return subprocess.call(cmdline) == 0
 
 
+def feed(proc, lines, pending):
+    "Writes lines to the co-process, remembering them until answered."
+    try:
+        for line in lines:
+            pending.put(line)
+            proc.stdin.write(line if line.endswith("\n") else line + "\n")
+    except BrokenPipeError:
+        pass
+    finally:
+        pending.put(None)
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def coproc(cmd, lines):
+    """Yields the lines that a single long-lived subcommand accepts.
+
+    Lines are written from a separate thread so that the subcommand is
+    free to buffer its answers without deadlocking us. They are line
+    buffered, so a slow stream like `tail -f` isn't held back."""
+    p = subprocess.PIPE
+    try:
+        proc = subprocess.Popen(cmd, stdin=p, stdout=p, text=True, bufsize=1)
+    except OSError as error:
+        raise ValueError("{}: {}".format(cmd[0], error.strerror or error))
+    pending = queue.SimpleQueue()
+    writer = threading.Thread(target=feed, args=(proc, lines, pending))
+    writer.daemon = True
+    writer.start()
+
+    for answer in proc.stdout:
+        line = pending.get()
+        if line is None:
+            proc.kill()
+            raise ValueError("{}: answered more lines than it was given".format(cmd[0]))
+        answer = answer.rstrip("\n")
+        if answer == "0" or (answer != "1" and answer == line.rstrip("\n")):
+            yield line
+
+    writer.join()
+    unanswered = 0
+    while pending.get() is not None:
+        unanswered += 1
+    if proc.wait() != 0:
+        raise ValueError("{}: exited with status {}".format(cmd[0], proc.returncode))
+    if unanswered:
+        message = "{}: exited without answering {} lines"
+        raise ValueError(message.format(cmd[0], unanswered))
+
+
+def py_predicate(expression):
+    "Compiles a python expression into a `lambda line: expression`."
+    body = ast.parse(expression, "<filter>", "eval").body
+    params = ast.arguments(
+        posonlyargs=[],
+        args=[ast.arg("line")],
+        kwonlyargs=[],
+        kw_defaults=[],
+        defaults=[],
+    )
+    function = ast.fix_missing_locations(ast.Expression(ast.Lambda(params, body)))
+    return eval(compile(function, "<filter>", "eval"), {"os": os, "re": re})
+
+
 def main(argv):
     if not argv[1:] or "-h" in argv or "--help" in argv:
         return __doc__
 
+    if argv[1] == "--py":
+        if not argv[2:]:
+            return __doc__
+        predicate = py_predicate(" ".join(argv[2:]))
+        write = sys.stdout.write
+        for line in sys.stdin:
+            if predicate(line.rstrip("\n")):
+                write(line)
+        return
+
+    if argv[1] == "--coproc":
+        if not argv[2:]:
+            return __doc__
+        try:
+            for line in coproc(argv[2:], sys.stdin):
+                sys.stdout.write(line)
+                sys.stdout.flush()
+        except ValueError as error:
+            return str(error)
+        return
+
     cmd = " ".join(argv[1:])
     for line in sys.stdin:
         if test(cmd, line.strip()):
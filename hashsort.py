@@ -1,26 +1,83 @@
 #!/usr/bin/env python
-"""Usage: hashsort
+"""Usage: hashsort [-S SIZE] [--seed SEED]
 
 Sorts lines in stdin according to the hash of those lines. Outputs
 the lines in a deterministic order that is hard to predict; a sort of
-non-random shuffle.
+non-random shuffle. Different seeds give different, but equally
+reproducible, orders.
+
+Inputs bigger than the buffer size (-S, default 256M) are sorted in
+pieces using temporary files.
 """
 
-import sys
+import argparse
 import hashlib
+import itertools
+import sys
+
+import extsort
+
+BLOCK_SIZE = 1024 * 1024
+LINES_PER_WRITE = 65536
+
+
+def read_lines(file):
+    "Yields the lines of a binary file, without newlines, reading big blocks."
+    rest = b""
+    for block in iter(lambda: file.read(BLOCK_SIZE), b""):
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+
+def write_lines(file, lines):
+    "Writes lines to a binary file, adding newlines, in big batches."
+    while batch := list(itertools.islice(lines, LINES_PER_WRITE)):
+        batch.append(b"")
+        file.write(b"\n".join(batch))
+
+
+def hasher(seed=b""):
+    "Makes a function hashing a list of lines into 64 bit integers."
+    if len(seed) > hashlib.blake2b.MAX_KEY_SIZE:
+        seed = hashlib.blake2b(seed).digest()
+    base = hashlib.blake2b(digest_size=8, key=seed)
+    from_bytes = int.from_bytes
+
+    def myhash(lines):
+        hashes = []
+        for line in lines:
+            h = base.copy()
+            h.update(line)
+            hashes.append(from_bytes(h.digest(), "big"))
+        return hashes
+
+    return myhash
 
 
-def myhash(string):
-    bytelist = string.strip("\n").encode()
-    return hashlib.sha256(bytelist).hexdigest()
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "-S",
+        "--buffer-size",
+        type=extsort.parse_size,
+        default=extsort.DEFAULT_BUFFER_SIZE,
+    )
+    parser.add_argument("--seed", default="")
+    return parser.parse_args(argv[1:])
 
 
 def main(argv):
-    if "--help" in argv or "-h" in argv:
-        return __doc__
+    args = parse_args(argv)
 
-    for line in sorted(sys.stdin, key=myhash):
-        sys.stdout.write(line)
+    myhash = hasher(args.seed.encode())
+    lines = read_lines(sys.stdin.buffer)
+    lines = extsort.external_sort(lines, buffer_size=args.buffer_size, keys=myhash)
+    write_lines(sys.stdout.buffer, lines)
 
 
 if __name__ == "__main__":
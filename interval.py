@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-"""Usage: interval
+"""Usage: interval [-w N] [--rate] [--histogram WIDTH]
 
 Takes a stream of numbers on stdin and prints the intervals between
 adjacent numbers. Example:
@@ -8,25 +8,121 @@ adjacent numbers. Example:
     1.0
     2.0
     -3.0
+
+With -w each interval is replaced by the mean of the last N intervals.
+With --rate the numbers are taken to be timestamps in seconds and the
+number of events per second (over the last N intervals) is printed
+instead. With --histogram nothing is printed until the end, when the
+number of values falling into each bucket of the given width is printed
+as `<bucket start> <count>`:
+
+    $ interval --histogram 0.5 < timestamps
 """
 
+import argparse
+import collections
+import math
+import operator
 import sys
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def read_numbers(file):
+    """Yields lists of the numbers in blocks of a binary file.
+
+    Each read returns whatever is available, up to a big block, so numbers
+    arriving slowly are passed on as they come."""
+    rest = b""
+    for block in iter(lambda: file.read1(BLOCK_SIZE), b""):
+        fields = (rest + block).split()
+        # the last field may continue in the next block
+        rest = fields.pop() if fields and not block[-1:].isspace() else b""
+        if fields:
+            yield list(map(float, fields))
+    if rest:
+        yield [float(rest)]
+
+
+def intervals(blocks):
+    "Yields lists of the differences between adjacent numbers in the blocks."
+    last = []
+    for numbers in blocks:
+        numbers = last + numbers
+        if numpy is not None:
+            yield numpy.diff(numbers).tolist()
+        else:
+            yield list(map(operator.sub, numbers[1:], numbers))
+        last = numbers[-1:]
+
 
-def pairs(iterable):
-    iterator = iter(iterable)
-    old = next(iterator)
-    for new in iterator:
-        yield old, new
-        old = new
+def moving_means(blocks, size):
+    "Replaces each value with the mean of the last size values."
+    window = collections.deque()
+    total = 0.0
+    for values in blocks:
+        means = []
+        for value in values:
+            window.append(value)
+            total += value
+            if len(window) > size:
+                total -= window.popleft()
+            means.append(total / len(window))
+        yield means
+
+
+def rates(blocks):
+    "Converts mean intervals into events per second."
+    for values in blocks:
+        yield [1 / value if value else math.inf for value in values]
+
+
+def histogram(blocks, width):
+    counts = collections.Counter()
+    for values in blocks:
+        counts.update(math.floor(value / width) for value in values)
+    return sorted(counts.items())
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-w", "--window", type=int, default=1, metavar="N")
+    parser.add_argument("--rate", action="store_true")
+    parser.add_argument("--histogram", type=float, metavar="WIDTH")
+    return parser.parse_args(argv[1:])
 
 
 def main(argv):
-    if "-h" in argv or "--help" in argv:
-        return __doc__
+    args = parse_args(argv)
+    if args.window < 1:
+        return "interval: the window must be at least 1"
+    if args.histogram is not None and args.histogram <= 0:
+        return "interval: the histogram width must be positive"
+
+    try:
+        blocks = intervals(read_numbers(sys.stdin.buffer))
+        if args.window > 1:
+            blocks = moving_means(blocks, args.window)
+        if args.rate:
+            blocks = rates(blocks)
+
+        if args.histogram is not None:
+            for bucket, count in histogram(blocks, args.histogram):
+                print(bucket * args.histogram, count)
+            return
 
-    for pre, post in pairs(sys.stdin):
-        print(float(post.strip()) - float(pre.strip()))
+        for values in blocks:
+            sys.stdout.write("".join(repr(value) + "\n" for value in values))
+            sys.stdout.flush()
+    except ValueError as error:
+        return "interval: {}".format(error)
 
 
 if __name__ == "__main__":
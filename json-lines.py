@@ -1,17 +1,127 @@
 #!/usr/bin/env python
 """Takes a pipeline and converts it to a json array — one entry for each line.
+
+Usage: json-lines [--ndjson] [--decode]
+
+The array is written as the input arrives, so it works on inputs of any
+size. With --ndjson each line becomes a json string on a line of its own
+instead of an entry in an array. With --decode it works the other way
+around, turning a json array (or ndjson with --ndjson) back into lines.
+Strings are written as they are, anything else is written as json.
 """
 
+import itertools
 import json
+import re
 import sys
 
+BLOCK_SIZE = 1024 * 1024
+LINES_PER_WRITE = 8192
+
+whitespace = re.compile(r"\s*")
+number_chars = frozenset("0123456789+-.eE")
+
+
+def encode(lines, ndjson=False):
+    "Yields pieces of the json array (or ndjson) holding the lines."
+    if ndjson:
+        while batch := list(itertools.islice(lines, LINES_PER_WRITE)):
+            yield "".join(json.dumps(line.rstrip("\n")) + "\n" for line in batch)
+        return
+
+    yield "["
+    separator = ""
+    while batch := list(itertools.islice(lines, LINES_PER_WRITE)):
+        yield separator + ", ".join(json.dumps(line.rstrip("\n")) for line in batch)
+        separator = ", "
+    yield "]"
+
+
+def decode_array(file):
+    "Yields the values of a json array, reading the file a block at a time."
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        block = file.read(BLOCK_SIZE)
+        eof = not block
+        buffer = buffer[pos:] + block
+        pos = 0
+        return not eof
+
+    def peek():
+        "Skips whitespace and returns the next character."
+        nonlocal pos
+        while True:
+            pos = whitespace.match(buffer, pos).end()
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                raise ValueError("unexpected end of input")
+
+    def skip(expected):
+        "Consumes the next character, which must be one of expected."
+        nonlocal pos
+        char = peek()
+        if char not in expected:
+            raise ValueError("expected {!r} but found {!r}".format(expected, char))
+        pos += 1
+        return char
+
+    def next_value():
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # a number at the end of the buffer may continue in the next block
+                if eof or (end < len(buffer) and buffer[end] not in number_chars):
+                    pos = end
+                    return value
+            fill()
+
+    skip("[")
+    if peek() == "]":
+        return
+    while True:
+        yield next_value()
+        if skip(",]") == "]":
+            return
+
+
+def decode_ndjson(file):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def to_line(value):
+    return (value if isinstance(value, str) else json.dumps(value)) + "\n"
+
 
 def main(argv):
     if "-h" in argv or "--help" in argv:
         return __doc__
 
-    lines = json.dumps([line.rstrip("\n") for line in sys.stdin.readlines()])
-    sys.stdout.write(lines)
+    ndjson = "--ndjson" in argv
+    if "--decode" not in argv:
+        for piece in encode(sys.stdin, ndjson):
+            sys.stdout.write(piece)
+        return
+
+    values = decode_ndjson(sys.stdin) if ndjson else decode_array(sys.stdin)
+    try:
+        while batch := list(itertools.islice(values, LINES_PER_WRITE)):
+            sys.stdout.write("".join(map(to_line, batch)))
+    except ValueError as error:
+        return "json-lines: {}".format(error)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 #!/usr/bin/env python
-"""Usage: keysort <subcommand>...
+"""Usage: keysort [-j N] [--batch] [--cache] [-S SIZE] <subcommand>...
 
 Sorts lines of stdin based on the output of feeding that line into the
 stdin of the subcommand. Allows you to sort a stream based on things
@@ -8,11 +8,33 @@ other than the contents of the stream itself.
 In this example we sort files in the current working directory by their last modified time:
 
     ls | keysort xargs stat --format %Y
+
+The subcommand is only run once for each distinct line. With -j up to N
+subcommands are run at once. With --batch the subcommand is run a single
+time with all of the distinct lines on its stdin and must print exactly
+one key per line, in the same order:
+
+    ls | keysort --batch xargs -d '\\n' stat --format %Y
+
+With --cache the keys are remembered in `~/.cache/keysort` so that
+sorting the same lines with the same subcommand again does not need to
+run it at all. Only use this when the key for a line never changes.
+
+Inputs bigger than the buffer size (-S, default 256M) are sorted in
+pieces using temporary files. Keys are then only shared between
+identical lines within the same piece.
 """
 
+import argparse
+import concurrent.futures
+import dbm
+import functools
+import os
+import pathlib
 import sys
 import subprocess
-import functools
+
+import extsort
 
 
 def pipe(cmd, input):
@@ -22,13 +44,93 @@ def pipe(cmd, input):
     return stdout.decode()
 
 
+def xdg_cache_dir(name):
+    default = pathlib.Path("~/.cache").expanduser()
+    base = pathlib.Path(os.environ.get("XDG_CACHE_HOME", default))
+    fname = base / name
+    if not fname.exists():
+        fname.mkdir(parents=True)
+    return fname
+
+
+def batch_keys(cmd, lines):
+    "Computes the keys for all lines with a single run of the subcommand."
+    text = "".join(line if line.endswith("\n") else line + "\n" for line in lines)
+    keys = pipe(cmd, text).splitlines()
+    if len(keys) != len(lines):
+        raise ValueError(
+            "{} printed {} keys for {} lines".format(cmd[0], len(keys), len(lines))
+        )
+    return keys
+
+
+def compute_keys(cmd, lines, jobs=1, batch=False):
+    "Maps each of the lines to its key."
+    if batch:
+        keys = batch_keys(cmd, lines) if lines else []
+    elif jobs > 1:
+        with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+            keys = list(executor.map(functools.partial(pipe, cmd), lines))
+    else:
+        keys = [pipe(cmd, line) for line in lines]
+    return dict(zip(lines, keys))
+
+
+def cached_keys(cmd, lines, **kwargs):
+    "Like compute_keys, but looks up and stores keys in an on-disk cache."
+    prefix = "\0".join(cmd) + "\0\0"
+    with dbm.open(str(xdg_cache_dir("keysort") / "keys"), "c") as cache:
+        keys = {}
+        missing = []
+        for line in lines:
+            cached = cache.get(prefix + line)
+            if cached is None:
+                missing.append(line)
+            else:
+                keys[line] = cached.decode()
+        computed = compute_keys(cmd, missing, **kwargs)
+        for line, key in computed.items():
+            cache[prefix + line] = key
+        keys.update(computed)
+    return keys
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("--batch", action="store_true")
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument(
+        "-S",
+        "--buffer-size",
+        type=extsort.parse_size,
+        default=extsort.DEFAULT_BUFFER_SIZE,
+    )
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    return parser.parse_args(argv[1:])
+
+
 def main(argv):
-    if not argv[1:] or "-h" in argv or "--help" in argv:
+    args = parse_args(argv)
+    if not args.command:
         return __doc__
 
-    my_key = functools.partial(pipe, argv[1:])
-    for line in sorted(sys.stdin, key=my_key):
-        sys.stdout.write(line)
+    get_keys = cached_keys if args.cache else compute_keys
+
+    def run_keys(lines):
+        distinct = list(dict.fromkeys(lines))
+        keys = get_keys(args.command, distinct, jobs=args.jobs, batch=args.batch)
+        return [keys[line] for line in lines]
+
+    try:
+        lines = extsort.external_sort(
+            sys.stdin, buffer_size=args.buffer_size, keys=run_keys
+        )
+        sys.stdout.writelines(lines)
+    except ValueError as error:
+        return str(error)
 
 
 if __name__ == "__main__":
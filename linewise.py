@@ -1,29 +1,120 @@
 #!/usr/bin/env python
-"""Usage: linewise <subcommand>...
+"""Usage: linewise [-j N] [--unordered] <subcommand>...
 
 Runs a sub-command for each line in stdin, writing that line into the
 stdin of the sub-command and concatenating the outputs. Similar to xargs
 except that it uses stdin instead of command-line arguments.
+
+With -j up to N sub-commands are run at once. Output is still written in
+the order of the input lines as soon as it is ready, unless --unordered
+is given, in which case each output is written as soon as its
+sub-command finishes. A sub-command that fails is reported on stderr
+but does not stop the rest of the stream.
 """
 
+import argparse
+import concurrent.futures
+import queue
 import sys
 import subprocess
-import functools
+import threading
 
 
 def pipe(cmd, input):
+    "Returns an error message (or None), the input and the output."
     p = subprocess.PIPE
-    proc = subprocess.Popen(cmd, stdin=p, stdout=p)
+    try:
+        proc = subprocess.Popen(cmd, stdin=p, stdout=p)
+    except OSError as error:
+        return "{}: {}".format(cmd[0], error.strerror or error), input, ""
     stdout, _ = proc.communicate(input.encode())
-    return stdout.decode()
+    try:
+        output = stdout.decode()
+    except UnicodeDecodeError:
+        return "{} wrote invalid utf-8".format(cmd[0]), input, ""
+    if proc.returncode != 0:
+        return "{} exited with {}".format(cmd[0], proc.returncode), input, output
+    return None, input, output
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("--unordered", action="store_true")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    return parser.parse_args(argv[1:])
+
+
+def submit(executor, cmd, lines, ordered, slots, limit, finished):
+    """Runs cmd for each line, putting the futures on the finished queue.
+
+    They are put there in input order, or as they complete if not ordered,
+    and a None goes last. A slot is taken for each line, and given back
+    once its output is written, so at most limit lines are in flight."""
+    try:
+        for line in lines:
+            slots.acquire()
+            future = executor.submit(pipe, cmd, line)
+            if ordered:
+                finished.put(future)
+            else:
+                future.add_done_callback(finished.put)
+        # wait for everything to be written
+        for _ in range(limit):
+            slots.acquire()
+    finally:
+        finished.put(None)
+
+
+def report(futures, slots):
+    "Writes each output as it arrives, complaining about failed commands."
+    failed = False
+    for future in futures:
+        error, line, output = future.result()
+        sys.stdout.write(output)
+        sys.stdout.flush()
+        slots.release()
+        if error:
+            failed = True
+            print(
+                "linewise: {} on line: {}".format(error, line.rstrip("\n")),
+                file=sys.stderr,
+            )
+    return 1 if failed else 0
 
 
 def main(argv):
-    if not argv[1:] or "-h" in argv or "--help" in argv:
+    args = parse_args(argv)
+    if not args.command:
         return __doc__
+    if args.jobs < 1:
+        return "linewise: -j must be at least 1"
 
-    for line in sys.stdin:
-        sys.stdout.write(pipe(argv[1:], line))
+    # ordered output can wait on a slow line, so allow more in flight then
+    limit = args.jobs if args.unordered else 2 * args.jobs
+    slots = threading.Semaphore(limit)
+    finished = queue.SimpleQueue()
+    with concurrent.futures.ThreadPoolExecutor(args.jobs) as executor:
+        # stdin is read in another thread so that output never waits on it
+        reader = threading.Thread(
+            target=submit,
+            args=(
+                executor,
+                args.command,
+                sys.stdin,
+                not args.unordered,
+                slots,
+                limit,
+                finished,
+            ),
+            daemon=True,
+        )
+        reader.start()
+        status = report(iter(finished.get, None), slots)
+        reader.join()
+        return status
 
 
 if __name__ == "__main__":
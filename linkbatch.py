@@ -0,0 +1,47 @@
+"""Helpers for making many links in one go, shared by rellink and mvln.
+
+This is not a command of its own. Paths are made absolute lexically
+where that is safe, and the directories that links are made in are kept
+open so that each link can be made relative to a directory fd instead of
+looking its whole path up again.
+"""
+
+import collections
+import os
+
+# how many directories to keep open at once
+OPEN_DIRS = 64
+
+
+def absolute(path):
+    """Makes path absolute without touching the filesystem, unless it
+    contains a `..` that might have to step back out of a symlink."""
+    if os.pardir in path.split(os.sep):
+        return os.path.realpath(path)
+    return os.path.abspath(path)
+
+
+class Directories:
+    """Keeps the most recently used directories open so that many links
+    can be made in them without looking their paths up each time."""
+
+    def __init__(self, size=OPEN_DIRS):
+        self.size = size
+        self.open = collections.OrderedDict()
+
+    def get(self, path):
+        "Returns an fd for the directory and its path with symlinks resolved."
+        if path in self.open:
+            self.open.move_to_end(path)
+            return self.open[path]
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        self.open[path] = fd, os.path.realpath(path)
+        if len(self.open) > self.size:
+            _, (old, _) = self.open.popitem(last=False)
+            os.close(old)
+        return self.open[path]
+
+    def close(self):
+        while self.open:
+            _, (fd, _) = self.open.popitem()
+            os.close(fd)
@@ -4,20 +4,122 @@ source that points to the destination. Follows symlinks in both source
 and destination because it doesn't make much sense to move a symlink
 just to put on in it's place.
 
+With --batch, `source<TAB>destination` pairs are read from stdin, one per
+line, and each of them is moved. Sources that are already linked to their
+destination are skipped, and the number of files moved, skipped and
+conflicting is printed to stderr at the end.
+
 The name is a combination of `mv` and `ln`."""
 
 import argparse
+import collections
 import os
 import pathlib
+import stat
 import sys
+from typing import Iterable
+
+import linkbatch
+
+SUMMARY = "{moved} moved, {skipped} skipped, {conflict} conflicting, {failed} failed"
+
+
+def lookup(path: str, directories: linkbatch.Directories) -> tuple:
+    "Returns the parent fd, basename and stat (or None) of a path."
+    parent, base = os.path.split(path)
+    fd, _ = directories.get(parent)
+    try:
+        return fd, base, os.stat(base, dir_fd=fd)
+    except FileNotFoundError:
+        return fd, base, None
+
+
+def move(
+    source: str,
+    dest: str,
+    directories: linkbatch.Directories,
+    force: bool,
+    resolve: bool,
+) -> str:
+    """Moves source to dest and links it back, returning "moved", "skipped"
+    or "conflict". Both paths must already be absolute."""
+    source_parent, source_base = os.path.split(source)
+    source_fd, real_source_parent = directories.get(source_parent)
+    source_stat = os.stat(source_base, dir_fd=source_fd, follow_symlinks=False)
+
+    dest_fd, dest_base, dest_stat = lookup(dest, directories)
+    if dest_stat and stat.S_ISDIR(dest_stat.st_mode):
+        dest = os.path.join(dest, source_base)
+        dest_fd, dest_base, dest_stat = lookup(dest, directories)
+
+    if dest_stat:
+        if stat.S_ISLNK(source_stat.st_mode):
+            try:
+                if os.path.samestat(os.stat(source_base, dir_fd=source_fd), dest_stat):
+                    # already moved and linked
+                    return "skipped"
+            except FileNotFoundError:
+                pass
+        if not force or os.path.samestat(source_stat, dest_stat):
+            return "conflict"
+
+    os.rename(source_base, dest_base, src_dir_fd=source_fd, dst_dir_fd=dest_fd)
+    if resolve:
+        contents = os.path.realpath(dest)
+    else:
+        contents = os.path.relpath(dest, real_source_parent)
+    os.symlink(contents, source_base, dir_fd=source_fd)
+    return "moved"
+
+
+def batch(lines: Iterable[str], force: bool) -> collections.Counter:
+    "Moves each `source<TAB>destination` line, returning the counts."
+    counts: collections.Counter = collections.Counter()
+    directories = linkbatch.Directories()
+    try:
+        for number, line in enumerate(lines, 1):
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            source, tab, dest = line.partition("\t")
+            if not tab or not source or not dest:
+                message = f"mvln: line {number}: expected source<TAB>destination"
+                print(message, file=sys.stderr)
+                counts["failed"] += 1
+                continue
+            resolve = os.path.isabs(dest)
+            source, dest = linkbatch.absolute(source), linkbatch.absolute(dest)
+            try:
+                result = move(source, dest, directories, force, resolve)
+            except OSError as error:
+                print(f"mvln: {source}: {error}", file=sys.stderr)
+                counts["failed"] += 1
+                continue
+            if result == "conflict":
+                print(f"mvln: {dest}: destination already exists", file=sys.stderr)
+            counts[result] += 1
+    finally:
+        directories.close()
+    return counts
 
 
 def main(args: list[str]) -> int | str:
     parser = argparse.ArgumentParser()
-    parser.add_argument("source", type=pathlib.Path)
-    parser.add_argument("destination", type=pathlib.Path)
+    parser.add_argument("source", type=pathlib.Path, nargs="?")
+    parser.add_argument("destination", type=pathlib.Path, nargs="?")
     parser.add_argument("-f", "--force", action="store_true")
+    parser.add_argument("-b", "--batch", action="store_true")
     arguments = parser.parse_args(args[1:])
+
+    if arguments.batch:
+        if arguments.source or arguments.destination:
+            parser.error("--batch takes no source or destination")
+        counts = batch(sys.stdin, arguments.force)
+        print("mvln:", SUMMARY.format_map(counts), file=sys.stderr)
+        return 1 if counts["conflict"] or counts["failed"] else 0
+    if not arguments.destination:
+        parser.error("the source and destination are required")
+
     source = arguments.source
     dest = arguments.destination
 
@@ -26,7 +128,7 @@ def main(args: list[str]) -> int | str:
     if dest.is_dir():
         dest = dest / source.name
     if dest.exists():
-        if not force:
+        if not arguments.force:
             return "Destination already exists"
         if source.samefile(dest):
             return "Cannot move a file onto itself"
@@ -1,13 +1,197 @@
 #!/usr/bin/env python
+"""Usage: numsum [-s] [-p PERCENTILE]...
+
+Prints the sum of the numbers in stdin. Numbers may be separated by any
+whitespace. The sum is computed with `math.fsum`, so it doesn't lose
+precision to rounding errors.
+
+With -s the count, mean, minimum, maximum and (sample) standard
+deviation are printed too, and -p prints a percentile. Percentiles are
+exact for up to 100000 numbers and estimated from a random sample of that
+size for more, so memory use stays the same however big the input is.
+
+    $ seq 100 | numsum -s -p 50 -p 90
+    sum 5050.0
+    count 100
+    mean 50.5
+    min 1.0
+    max 100.0
+    stddev 29.011491975882016
+    p50 50.5
+    p90 90.1
+"""
 
 # from num-utils
 # http://suso.suso.org/programs/num-utils
 
+import argparse
+import math
+import random
 import sys
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+BLOCK_SIZE = 1024 * 1024
+SAMPLE_SIZE = 100000
+
+
+def read_numbers(file):
+    "Yields lists of the numbers in big blocks of a binary file."
+    rest = b""
+    for block in iter(lambda: file.read(BLOCK_SIZE), b""):
+        fields = (rest + block).split()
+        # the last field may continue in the next block
+        rest = fields.pop() if fields and not block[-1:].isspace() else b""
+        if fields:
+            yield parse(fields)
+    if rest:
+        yield parse([rest])
+
+
+def parse(fields):
+    if numpy is not None:
+        try:
+            return numpy.array(fields, dtype=bytes).astype(numpy.float64).tolist()
+        except ValueError:
+            pass
+    try:
+        return list(map(float, fields))
+    except ValueError:
+        bad = next(field for field in fields if not is_number(field))
+        raise ValueError("not a number: {}".format(bad.decode(errors="replace")))
+
+
+def is_number(field):
+    try:
+        float(field)
+    except ValueError:
+        return False
+    return True
+
+
+class Stats:
+    "Statistics of a stream of numbers, updated one block at a time."
+
+    def __init__(self, sample_size=SAMPLE_SIZE):
+        self.count = 0
+        self.sum = 0.0
+        self.compensation = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sample = []
+        self.sample_size = sample_size
+        self.random = random.Random(0)
+        self.weight = 1.0
+        self.next_sample = sample_size
+
+    def add_sum(self, value):
+        "Neumaier summation of the exact block sums."
+        total = self.sum + value
+        if abs(self.sum) >= abs(value):
+            self.compensation += (self.sum - total) + value
+        else:
+            self.compensation += (value - total) + self.sum
+        self.sum = total
+
+    def update_sum(self, numbers):
+        "Updates only the count and the sum."
+        self.add_sum(math.fsum(numbers))
+        self.count += len(numbers)
+
+    def update(self, numbers):
+        n = len(numbers)
+        block_sum = math.fsum(numbers)
+        block_mean = block_sum / n
+        block_m2 = math.fsum((x - block_mean) ** 2 for x in numbers)
+
+        # Chan et al.'s method for combining the variance of two groups
+        delta = block_mean - self.mean
+        total = self.count + n
+        self.m2 += block_m2 + delta**2 * self.count * n / total
+        self.mean += delta * n / total
+        self.add_sum(block_sum)
+        self.min = min(self.min, min(numbers))
+        self.max = max(self.max, max(numbers))
+        self.update_sample(numbers)
+        self.count = total
+
+    def update_sample(self, numbers):
+        "Reservoir sampling with geometric skips (Li's algorithm L)."
+        start = self.count
+        if len(self.sample) < self.sample_size:
+            self.sample.extend(numbers[: self.sample_size - len(self.sample)])
+            if len(self.sample) == self.sample_size:
+                self.weight = self.next_weight()
+                self.next_sample = self.sample_size + self.skip()
+        while self.next_sample < start + len(numbers):
+            slot = self.random.randrange(self.sample_size)
+            self.sample[slot] = numbers[self.next_sample - start]
+            self.weight *= self.next_weight()
+            self.next_sample += 1 + self.skip()
+
+    def next_weight(self):
+        return math.exp(math.log(1.0 - self.random.random()) / self.sample_size)
+
+    def skip(self):
+        return int(math.log(1.0 - self.random.random()) / math.log(1.0 - self.weight))
+
+    def total(self):
+        return self.sum + self.compensation
+
+    def stddev(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def percentile(self, percent):
+        "Linearly interpolated percentile of the (sampled) numbers."
+        sample = sorted(self.sample)
+        position = (len(sample) - 1) * percent / 100
+        low = math.floor(position)
+        high = min(low + 1, len(sample) - 1)
+        return sample[low] + (sample[high] - sample[low]) * (position - low)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-s", "--stats", action="store_true")
+    parser.add_argument("-p", "--percentile", type=float, action="append", default=[])
+    return parser.parse_args(argv[1:])
+
 
 def main(argv):
-    print(sum(float(n) for n in sys.stdin))
+    args = parse_args(argv)
+    if any(not 0 <= percent <= 100 for percent in args.percentile):
+        return "numsum: percentiles must be between 0 and 100"
+
+    stats = Stats()
+    update = stats.update if args.stats or args.percentile else stats.update_sum
+    try:
+        for numbers in read_numbers(sys.stdin.buffer):
+            update(numbers)
+    except ValueError as error:
+        return "numsum: {}".format(error)
+
+    if not (args.stats or args.percentile):
+        print(stats.total())
+        return
+
+    print("sum", stats.total())
+    if args.stats:
+        print("count", stats.count)
+        if stats.count:
+            print("mean", stats.mean)
+            print("min", stats.min)
+            print("max", stats.max)
+            print("stddev", stats.stddev())
+    if stats.count:
+        for percent in args.percentile:
+            print("p{:g}".format(percent), stats.percentile(percent))
 
 
 if __name__ == "__main__":
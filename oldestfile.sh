@@ -7,10 +7,11 @@ Usage: oldestfile [directory]
 
 Prints the basename of the oldest file or folder in the given
 directory. If no directory is given then the cwd is assumed.
+
+This is a shortcut for \`topfiles --oldest -t atime\`.
 EOF
 	exit 1
 	;;
 esac
 
-dir="${1:-"$(pwd)"}"
-ls --sort=time --time=access --reverse "$dir" | head -n1
+exec topfiles --oldest --time atime "${1:-.}"
@@ -1,30 +1,67 @@
 #!/usr/bin/env python
-"""Usage: promote <data>...
+"""Usage: promote <line>...
 
-A filter that promotes a certain line to the top of its output, leaving
-all the other lines in their original order. If the line does not appear
-in the input then it will not be added and this filter is a no-op.
+A filter that promotes certain lines to the top of its output, leaving
+all the other lines in their original order. Each argument is a line to
+promote and they are output in the order they were given. A line that
+does not appear in the input will not be added, so if none of them
+appear then this filter is a no-op.
+
+Lines are only held back until all of the promoted lines have been
+seen, after which the rest of the input is passed straight through.
+Held back lines are kept in a temporary file if there are a lot of them.
 
 Example:
-    $ printf '1\\n2\\n3' | promote 2
+    $ printf '1\\n2\\n3\\n4' | promote 3 2
+    3
     2
     1
-    3"""
+    4"""
 
+import shutil
 import sys
+import tempfile
+
+# held back lines beyond this size are spilled to a temporary file
+SPOOL_SIZE = 16 * 1024 * 1024
+
+
+def promote(lines, targets, out):
+    pending = list(dict.fromkeys(targets))
+    wanted = set(pending)
+    found = set()
+
+    with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as held:
+        for line in lines:
+            line = line.rstrip(b"\n")
+            if line not in wanted:
+                held.write(line + b"\n")
+                continue
+            found.add(line)
+            while pending and pending[0] in found:
+                out.write(pending.pop(0) + b"\n")
+            if not pending:
+                break
+        else:
+            for target in pending:
+                if target in found:
+                    out.write(target + b"\n")
+
+        held.seek(0)
+        shutil.copyfileobj(held, out)
+
+    for line in lines:
+        line = line.rstrip(b"\n")
+        if line not in wanted:
+            out.write(line + b"\n")
 
 
 def main(argv):
     if not argv[1:] or "-h" in argv or "--help" in argv:
         return __doc__
 
-    item = " ".join(argv[1:])
-    lines = [l.strip("\n") for l in sys.stdin]
-    if item in lines:
-        print(item)
-    for line in lines:
-        if line != item:
-            print(line)
+    targets = [target.encode() for target in argv[1:]]
+    promote(sys.stdin.buffer, targets, sys.stdout.buffer)
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 #!/usr/bin/env python
-"""Usage: pyline <statement>
+"""Usage: pyline [-b BEGIN] [-e END] [-j N] <statement>
+       pyline [-b BEGIN] [-e END] --columns <expression>
 
 Takes a python statement as an argument and runs it for each line in
 stdin. The variable `i` holds the number of the current line.
@@ -8,6 +9,32 @@ For example, this only prints even numbered lines:
 
     pyline 'if i%2 == 0: print(line)'
 
+Variables are kept from one line to the next. The BEGIN statement is run
+before the first line and the END statement after the last one, which
+is handy for aggregating:
+
+    pyline -b 'total = 0' -e 'print(total)' 'total += len(line)'
+
+With -j the input is split into chunks that are run by N processes at
+once, and the output is written in the order of the input. BEGIN is
+also run quietly in each process, but every process only sees its own
+chunks, so variables are not shared between lines in different chunks
+and END can't be used.
+
+With --columns the input is read in blocks of whitespace separated
+fields and the argument is an expression that is evaluated once per
+block. Each field is a column; `c0`, `c1`, ... (and the list `c`) are
+arrays of integers or floats when every value in them is a number, and
+of strings otherwise. The expression should give one value per row, or a
+tuple of such columns, which is printed one row per line:
+
+    pyline --columns 'c1 / c0 * 100'
+    pyline --columns '(c0, c2 - c1)'
+
+Numpy arrays are used when numpy is installed, and the arrays can then
+be used with any numpy function as `numpy`. Otherwise the arithmetic and
+comparison operators still work on whole columns at once.
+
 The following modules are auto-imported for ease of use:
 
 * json
@@ -17,20 +44,245 @@ The following modules are auto-imported for ease of use:
 * sys
 """
 
+import argparse
+import array
+import collections
+import concurrent.futures
+import contextlib
+import io
+import itertools
 import json
 import math
+import operator
 import os
 import subprocess
 import sys
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+LINES_PER_CHUNK = 4096
+BLOCK_SIZE = 1024 * 1024
+
+
+def make_namespace():
+    return {
+        "json": json,
+        "math": math,
+        "os": os,
+        "subprocess": subprocess,
+        "sys": sys,
+    }
+
+
+def run(code, lines, namespace, start=0):
+    for i, line in enumerate(lines, start):
+        namespace["i"] = i
+        namespace["line"] = line.strip("\n")
+        exec(code, namespace)
+
+
+# state of a worker process when running with -j
+worker = {}
+
+
+def init_worker(statement, begin):
+    worker["code"] = compile(statement, "<pyline>", "exec")
+    worker["namespace"] = make_namespace()
+    if begin:
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(compile(begin, "<begin>", "exec"), worker["namespace"])
+
+
+def run_chunk(start, lines):
+    "Runs a chunk of lines in a worker, returning everything it printed."
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        run(worker["code"], lines, worker["namespace"], start)
+    return output.getvalue()
+
+
+def run_parallel(args, lines):
+    "Yields the output of each chunk in order, with 2*jobs chunks in flight."
+    with concurrent.futures.ProcessPoolExecutor(
+        args.jobs, initializer=init_worker, initargs=(args.statement, args.begin)
+    ) as executor:
+        window = collections.deque()
+        for start in itertools.count(0, LINES_PER_CHUNK):
+            chunk = list(itertools.islice(lines, LINES_PER_CHUNK))
+            if not chunk:
+                break
+            window.append(executor.submit(run_chunk, start, chunk))
+            if len(window) >= 2 * args.jobs:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+
+
+def elementwise(op, reflected=False):
+    def method(self, other):
+        if isinstance(other, (array.array, list, tuple)):
+            others = other
+        else:
+            others = itertools.repeat(other)
+        if reflected:
+            return make_column(map(op, others, self))
+        return make_column(map(op, self, others))
+
+    return method
+
+
+class Elementwise:
+    "Elementwise operators for columns, for when numpy is not installed."
+
+    __hash__ = None
+
+    __add__ = elementwise(operator.add)
+    __radd__ = elementwise(operator.add, reflected=True)
+    __sub__ = elementwise(operator.sub)
+    __rsub__ = elementwise(operator.sub, reflected=True)
+    __mul__ = elementwise(operator.mul)
+    __rmul__ = elementwise(operator.mul, reflected=True)
+    __truediv__ = elementwise(operator.truediv)
+    __rtruediv__ = elementwise(operator.truediv, reflected=True)
+    __floordiv__ = elementwise(operator.floordiv)
+    __rfloordiv__ = elementwise(operator.floordiv, reflected=True)
+    __mod__ = elementwise(operator.mod)
+    __rmod__ = elementwise(operator.mod, reflected=True)
+    __pow__ = elementwise(operator.pow)
+    __rpow__ = elementwise(operator.pow, reflected=True)
+    __lt__ = elementwise(operator.lt)
+    __le__ = elementwise(operator.le)
+    __gt__ = elementwise(operator.gt)
+    __ge__ = elementwise(operator.ge)
+    __eq__ = elementwise(operator.eq)
+    __ne__ = elementwise(operator.ne)
+
+    def __neg__(self):
+        return make_column(map(operator.neg, self))
+
+    def __abs__(self):
+        return make_column(map(abs, self))
+
+
+class Column(Elementwise, array.array):
+    "A compact column of integers or floats."
+
+
+class ObjectColumn(Elementwise, list):
+    "A column of anything else, such as strings or booleans."
+
+
+def make_column(values):
+    "Makes the most specific column that can hold the values."
+    values = list(values)
+    # an int array would turn booleans into 1 and 0
+    if not any(isinstance(value, bool) for value in values):
+        for typecode in ("q", "d"):
+            try:
+                return Column(typecode, values)
+            except (TypeError, OverflowError):
+                pass
+    return ObjectColumn(values)
+
+
+def parse_column(fields):
+    "Parses fields into a column of integers, floats or strings."
+    for typecode, convert in (("q", int), ("d", float)):
+        try:
+            return Column(typecode, map(convert, fields))
+        except (ValueError, OverflowError):
+            pass
+    return ObjectColumn(field.decode() for field in fields)
+
+
+def parse_numpy_column(fields):
+    column = numpy.array(fields, dtype=bytes)
+    for dtype in (numpy.int64, numpy.float64):
+        try:
+            return column.astype(dtype)
+        except (ValueError, OverflowError):
+            pass
+    return numpy.char.decode(column)
+
+
+def read_blocks(file):
+    "Yields lists of the lines in big blocks of a binary file."
+    rest = b""
+    for block in iter(lambda: file.read(BLOCK_SIZE), b""):
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()
+        yield lines
+    if rest:
+        yield [rest]
+
+
+def format_rows(result):
+    "Formats a column, or a tuple of columns, into lines of text."
+    columns = result if isinstance(result, tuple) else (result,)
+    columns = [
+        column.tolist() if hasattr(column, "tolist") else column for column in columns
+    ]
+    if not all(isinstance(column, (list, tuple)) for column in columns):
+        columns = [[column] for column in columns]
+    return "".join(" ".join(map(str, row)) + "\n" for row in zip(*columns))
+
+
+def run_columns(code, file, namespace):
+    to_column = parse_column if numpy is None else parse_numpy_column
+    for lines in read_blocks(file):
+        rows = [fields for fields in map(bytes.split, lines) if fields]
+        if not rows:
+            continue
+        columns = [
+            to_column(fields)
+            for fields in itertools.zip_longest(*rows, fillvalue=b"nan")
+        ]
+        namespace["c"] = columns
+        namespace.update(("c%d" % n, column) for n, column in enumerate(columns))
+        sys.stdout.write(format_rows(eval(code, namespace)))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-b", "--begin")
+    parser.add_argument("-e", "--end")
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("--columns", action="store_true")
+    parser.add_argument("statement")
+    return parser.parse_args(argv[1:])
+
 
 def main(argv):
-    if not argv[1:] or "-h" in argv or "--help" in argv:
+    if not argv[1:]:
         return __doc__
+    args = parse_args(argv)
+
+    if args.jobs > 1 and args.end:
+        return "pyline: END can't be used with -j"
+    if args.jobs > 1 and args.columns:
+        return "pyline: --columns can't be used with -j"
+
+    namespace = make_namespace()
+    if args.columns:
+        namespace["numpy"] = numpy
+    if args.begin:
+        exec(compile(args.begin, "<begin>", "exec"), namespace)
 
-    for i, line in enumerate(sys.stdin):
-        line = line.strip("\n")
-        exec(argv[1])
+    if args.columns:
+        code = compile(args.statement, "<pyline>", "eval")
+        run_columns(code, sys.stdin.buffer, namespace)
+    elif args.jobs > 1:
+        for output in run_parallel(args, sys.stdin):
+            sys.stdout.write(output)
+    else:
+        run(compile(args.statement, "<pyline>", "exec"), sys.stdin, namespace)
+    if args.end:
+        exec(compile(args.end, "<end>", "exec"), namespace)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,24 @@
 #!/usr/bin/env python
 """Create a relative symbolic link. Unlike `ln -s`, both the target and
-the name should be specified relative to the current working directory."""
+the name should be specified relative to the current working directory.
 
+With --batch, `target<TAB>name` pairs are read from stdin, one per line,
+and a link is made for each of them. Names that are already linked to
+their target are skipped, and the number of links created, skipped and
+conflicting is printed to stderr at the end."""
+
+import collections
 import os
+import stat
 import sys
 import argparse
 
+import linkbatch
+
+SUMMARY = (
+    "{created} created, {skipped} skipped, {conflict} conflicting, {failed} failed"
+)
+
 
 def parse_name(name, target):
     name = os.path.abspath(name)
@@ -14,18 +27,103 @@ def parse_name(name, target):
     return name
 
 
+def link(target, name, directories, absolute_link=False, into_dir=True):
+    """Links name to target, returning "created", "skipped" or "conflict".
+
+    Both paths must already be absolute."""
+    parent, base = os.path.split(name)
+    fd, real_parent = directories.get(parent)
+    if absolute_link:
+        contents = target
+    else:
+        contents = os.path.relpath(target, real_parent)
+
+    try:
+        os.symlink(contents, base, dir_fd=fd)
+        return "created"
+    except FileExistsError:
+        pass
+
+    if stat.S_ISLNK(os.stat(base, dir_fd=fd, follow_symlinks=False).st_mode):
+        if os.readlink(base, dir_fd=fd) == contents:
+            return "skipped"
+        try:
+            existing = os.stat(base, dir_fd=fd)
+        except FileNotFoundError:
+            # name is a broken link, just remove it and try again
+            os.unlink(base, dir_fd=fd)
+            os.symlink(contents, base, dir_fd=fd)
+            return "created"
+        if os.path.samestat(existing, os.stat(target)):
+            return "skipped"
+        is_dir = stat.S_ISDIR(existing.st_mode)
+    else:
+        is_dir = os.path.isdir(name)
+    if is_dir and into_dir:
+        inside = os.path.join(name, os.path.basename(target))
+        return link(target, inside, directories, absolute_link, into_dir=False)
+    return "conflict"
+
+
+def batch(lines, absolute_link=False):
+    "Makes a link for each `target<TAB>name` line, returning the counts."
+    counts = collections.Counter()
+    directories = linkbatch.Directories()
+    try:
+        for number, line in enumerate(lines, 1):
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            target, tab, name = line.partition("\t")
+            if not tab or not target or not name:
+                message = "rellink: line {}: expected target<TAB>name"
+                print(message.format(number), file=sys.stderr)
+                counts["failed"] += 1
+                continue
+            target, name = linkbatch.absolute(target), linkbatch.absolute(name)
+            try:
+                if not os.path.exists(target):
+                    raise FileNotFoundError("can't find {}".format(target))
+                result = link(target, name, directories, absolute_link)
+            except OSError as error:
+                print("rellink: {}: {}".format(name, error), file=sys.stderr)
+                counts["failed"] += 1
+                continue
+            if result == "conflict":
+                print("rellink: {} already exists".format(name), file=sys.stderr)
+            counts[result] += 1
+    finally:
+        directories.close()
+    return counts
+
+
 def main(argv):
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("target")
-    parser.add_argument("name")
+    parser.add_argument("target", nargs="?")
+    parser.add_argument("name", nargs="?")
     parser.add_argument(
         "-a",
         "--absolute",
         action="store_true",
         help="Have the link be absolute instead",
     )
+    parser.add_argument(
+        "-b",
+        "--batch",
+        action="store_true",
+        help="Read target<TAB>name pairs from stdin",
+    )
     opts = parser.parse_args(argv[1:])
 
+    if opts.batch:
+        if opts.target or opts.name:
+            parser.error("--batch takes no target or name")
+        counts = batch(sys.stdin, opts.absolute)
+        print("rellink:", SUMMARY.format_map(counts), file=sys.stderr)
+        return 1 if counts["conflict"] or counts["failed"] else 0
+    if not opts.name:
+        parser.error("the target and name are required")
+
     name = parse_name(opts.name, opts.target)
     target = os.path.abspath(opts.target)
 
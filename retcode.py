@@ -1,16 +1,100 @@
 #!/usr/bin/env python
 """Usage: retcode <subcommand>...
+       retcode --batch [-j N] [-t TIMEOUT]
 
 Runs the subcommand and prints its return code. Discards the subcommand's
-stdout and stderr."""
+stdout and stderr.
 
+With --batch the commands are read from stdin instead, one shell command
+per line, and up to N of them (default 8) are run at once. As each one
+finishes a `<code><TAB><seconds><TAB><command>` line is printed. A
+command that takes longer than TIMEOUT seconds is killed and gets the
+code 124, like with `timeout`. A summary is printed to stderr at the end
+and the exit status is the highest code of any of the commands."""
+
+import argparse
+import concurrent.futures
+import os
+import signal
 import sys
 import subprocess
+import time
+
+TIMED_OUT = 124
+
+
+def run(command, timeout=None):
+    "Runs a shell command quietly, returning its code and duration."
+    dn = subprocess.DEVNULL
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        command, shell=True, stdin=dn, stdout=dn, stderr=dn, start_new_session=True
+    )
+    try:
+        retcode = proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        # kill the whole process group, not just the shell
+        os.killpg(proc.pid, signal.SIGKILL)
+        proc.wait()
+        retcode = TIMED_OUT
+    if retcode < 0:
+        retcode = 128 - retcode
+    return retcode, time.monotonic() - start
+
+
+def batch(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-b", "--batch", action="store_true")
+    parser.add_argument("-j", "--jobs", type=int, default=8)
+    parser.add_argument("-t", "--timeout", type=float)
+    args = parser.parse_args(argv[1:])
+
+    commands = [line.strip() for line in sys.stdin]
+    commands = [
+        command for command in commands if command and not command.startswith("#")
+    ]
+
+    codes = []
+    with concurrent.futures.ThreadPoolExecutor(max(args.jobs, 1)) as executor:
+        jobs = {
+            executor.submit(run, command, args.timeout): command for command in commands
+        }
+        for job in concurrent.futures.as_completed(jobs):
+            retcode, duration = job.result()
+            codes.append(retcode)
+            print("{}\t{:.3f}\t{}".format(retcode, duration, jobs[job]), flush=True)
+
+    failed = sum(1 for code in codes if code != 0)
+    timed_out = codes.count(TIMED_OUT)
+    print(
+        "retcode: {} commands, {} failed, {} timed out".format(
+            len(codes), failed, timed_out
+        ),
+        file=sys.stderr,
+    )
+    return min(max(codes, default=0), 255)
+
+
+def wants_batch(args):
+    "Checks for --batch among the options that come before any subcommand."
+    args = iter(args)
+    for arg in args:
+        if arg in ("-b", "--batch"):
+            return True
+        if arg in ("-j", "--jobs", "-t", "--timeout"):
+            next(args, None)
+        elif not arg.startswith("-"):
+            return False
+    return False
 
 
 def main(argv):
     if not argv[1:] or argv[1] == "-h" or argv[1] == "--help":
         return __doc__
+    if wants_batch(argv[1:]):
+        return batch(argv)
 
     dn = subprocess.DEVNULL
     retcode = subprocess.call(argv[1:], stdout=dn, stderr=dn)
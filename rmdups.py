@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+"""Usage: rmdups [--bits 64|128] [--window N | --bloom [--capacity N] [--error-rate P]]
+
+A filter that reads a list of newline separated items from stdin and
+removes any lines that are duplicates of an already output line.
+
+Only a 64 bit hash of each line is remembered rather than the line
+itself, packed into a table that takes about 20 bytes per distinct line
+(use --bits 128 to make collisions even less likely for huge inputs, at
+twice the memory). With --window only the last N distinct lines are
+remembered, so a line is only removed if it was seen recently. With
+--bloom a bloom filter sized for --capacity distinct lines is used
+instead; it takes a fixed amount of memory but wrongly removes about
+--error-rate of the distinct lines once that many have been seen. The
+bloom filter always hashes lines to 128 bits, so --bits can't be used
+with it.
+"""
+
+import argparse
+import array
+import collections
+import hashlib
+import math
+import sys
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def read_blocks(file):
+    """Yields lists of the lines of a binary file, without newlines.
+
+    Each read returns whatever is available, up to a big block, so a slow
+    stream like `tail -f` is passed on as it comes instead of stalling."""
+    rest = b""
+    for block in iter(lambda: file.read1(BLOCK_SIZE), b""):
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()
+        yield lines
+    if rest:
+        yield [rest]
+
+
+def hasher(bits):
+    size = bits // 8
+    blake2b = hashlib.blake2b
+    from_bytes = int.from_bytes
+    return lambda line: from_bytes(blake2b(line, digest_size=size).digest(), "big")
+
+
+MASK64 = (1 << 64) - 1
+
+
+class DigestSet:
+    """A set of 64 or 128 bit digests packed into an open addressing table.
+
+    A set of ints takes around 70 bytes per entry, while this takes 8 or 16
+    bytes per slot and keeps the table between a quarter and half full.
+    A zero word marks an empty slot, so a zero digest is stored as 1."""
+
+    def __init__(self, bits, slots=1024):
+        self.words = bits // 64
+        self.add = self.add64 if self.words == 1 else self.add128
+        self.mask = slots - 1
+        self.table = array.array("Q", bytes(8 * self.words * slots))
+        self.count = 0
+
+    def add64(self, key):
+        "Adds a digest, returning False if it was already there."
+        key = key or 1
+        table, mask = self.table, self.mask
+        index = key & mask
+        while slot := table[index]:
+            if slot == key:
+                return False
+            index = (index + 1) & mask
+        table[index] = key
+        self.added()
+        return True
+
+    def add128(self, key):
+        high, low = (key >> 64) or 1, key & MASK64
+        table, mask = self.table, self.mask
+        index = low & mask
+        while slot := table[2 * index]:
+            if slot == high and table[2 * index + 1] == low:
+                return False
+            index = (index + 1) & mask
+        table[2 * index] = high
+        table[2 * index + 1] = low
+        self.added()
+        return True
+
+    def added(self):
+        self.count += 1
+        if self.count * 2 > self.mask + 1:
+            self.grow()
+
+    def grow(self):
+        "Doubles the number of slots, adding the digests in again."
+        old, words = self.table, self.words
+        self.__init__(64 * words, 2 * (self.mask + 1))
+        if words == 1:
+            keys = filter(None, old)
+        else:
+            keys = (old[i] << 64 | old[i + 1] for i in range(0, len(old), 2) if old[i])
+        for key in keys:
+            self.add(key)
+
+
+def unique(blocks, digest, bits):
+    "Yields the lines of each block that haven't been seen before."
+    add = DigestSet(bits).add
+    for lines in blocks:
+        yield [line for line in lines if add(digest(line))]
+
+
+def unique_window(blocks, digest, size):
+    "Like unique, but only remembers the size most recently seen lines."
+    seen = collections.OrderedDict()
+    for lines in blocks:
+        kept = []
+        for line in lines:
+            key = digest(line)
+            if key in seen:
+                seen.move_to_end(key)
+                continue
+            seen[key] = None
+            if len(seen) > size:
+                seen.popitem(last=False)
+            kept.append(line)
+        yield kept
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key):
+        "Adds a 128 bit key, returning False if it was (probably) already there."
+        first = key & 0xFFFFFFFFFFFFFFFF
+        step = (key >> 64) | 1
+        bits = self.bits
+        new = False
+        for i in range(self.hashes):
+            index = (first + i * step) % self.size
+            byte, mask = index >> 3, 1 << (index & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        return new
+
+
+def unique_bloom(blocks, digest, bloom):
+    for lines in blocks:
+        yield [line for line in lines if bloom.add(digest(line))]
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--bits", type=int, choices=(64, 128))
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--window", type=int, metavar="N")
+    group.add_argument("--bloom", action="store_true")
+    parser.add_argument("--capacity", type=int, default=10_000_000, metavar="N")
+    parser.add_argument("--error-rate", type=float, default=0.001, metavar="P")
+    return parser.parse_args(argv[1:])
+
+
+def main(argv):
+    args = parse_args(argv)
+    blocks = read_blocks(sys.stdin.buffer)
+
+    if args.bloom:
+        if args.bits:
+            return "rmdups: --bits can't be used with --bloom"
+        if args.capacity < 1 or not 0 < args.error_rate < 1:
+            return "rmdups: the capacity must be positive and the error rate below 1"
+        bloom = BloomFilter(args.capacity, args.error_rate)
+        blocks = unique_bloom(blocks, hasher(128), bloom)
+    elif args.window is not None:
+        if args.window < 1:
+            return "rmdups: the window must be at least 1"
+        blocks = unique_window(blocks, hasher(args.bits or 64), args.window)
+    else:
+        bits = args.bits or 64
+        blocks = unique(blocks, hasher(bits), bits)
+
+    output = sys.stdout.buffer
+    for lines in blocks:
+        if lines:
+            lines.append(b"")
+            output.write(b"\n".join(lines))
+            output.flush()
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main(sys.argv))
+    except KeyboardInterrupt:
+        pass
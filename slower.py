@@ -1,33 +1,213 @@
 #!/usr/bin/env python
-"""Usage: slower [wait]
+"""Usage: slower [wait] [-l LINES] [-b BYTES] [--burst SECONDS] [--report]
 
-A filter that outputs one line every \`wait\` seconds. Default wait is
+A filter that outputs one line every \\`wait\\` seconds. Default wait is
 1 second.
+
+Instead of a wait, a rate can be given in lines per second (-l) and/or
+bytes per second (-b, with an optional K, M or G suffix). Lines are sent
+on a fixed schedule, so time spent writing doesn't slow the overall rate
+down. With --burst the output may run up to that many seconds ahead of
+the schedule, for example to catch up after the input stalled. With
+--report the achieved rate is printed to stderr at the end.
+
+    slower -l 5000 < access.log
+    slower -b 10M --burst 0.1 < dump.sql
 """
 
+import argparse
+import re
 import sys
 import time
 
+# lines due within this many seconds of each other are written together
+TICK = 0.002
+
+BLOCK_SIZE = 64 * 1024
+
+SUFFIXES = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+
+
+def parse_rate(string):
+    match = re.fullmatch(r"([0-9.]+)([kmg]?)b?", string.strip(), re.IGNORECASE)
+    if not match:
+        raise ValueError("invalid rate {!r}".format(string))
+    return float(match.group(1)) * SUFFIXES[match.group(2).lower()]
+
+
+class Schedule:
+    """Sends things at a steady rate using the generic cell rate algorithm.
+
+    Each send moves the theoretical arrival time on by cost/rate. A send is
+    due once the clock is within `burst` seconds of that time, so being
+    late for one send doesn't push back all the following ones. Only
+    things that become available later than their arrival time do."""
+
+    def __init__(self, rate, burst, now):
+        self.interval = 1 / rate
+        self.burst = burst
+        self.arrival = now
+
+    def due(self):
+        return self.arrival - self.burst
+
+    def send(self, cost, available):
+        self.arrival = max(self.arrival, available) + cost * self.interval
+
+
+def read_lines(file):
+    """Yields the complete lines from each read of file as a list.
+
+    Each read returns whatever is available, so lines are passed on as
+    soon as they arrive instead of once a whole block has filled up."""
+    rest = b""
+    while True:
+        block = file.read1(BLOCK_SIZE)
+        if not block:
+            break
+        data = rest + block
+        end = data.rfind(b"\n") + 1
+        rest = data[end:]
+        if end:
+            yield [line + b"\n" for line in data[: end - 1].split(b"\n")]
+    if rest:
+        yield [rest]
 
-def slower(wait):
-    for line in sys.stdin:
-        sys.stdout.write(line)
-        time.sleep(wait)
+
+def slower(blocks, output, schedules, clock=time.monotonic, sleep=time.sleep):
+    """Writes the lines in blocks of lines to output according to the
+    schedules of (schedule, cost)."""
+    pending = []
+    blocks = iter(blocks)
+    while True:
+        # the next read might block, so don't hold anything back
+        if pending:
+            output.write(b"".join(pending))
+            output.flush()
+            pending = []
+        before = clock()
+        lines = next(blocks, None)
+        if lines is None:
+            break
+        # only an input stall moves the schedule, never our own lateness
+        available = clock()
+        if available - before < TICK:
+            available = 0
+        for line in lines:
+            due = max((schedule.due() for schedule, _ in schedules), default=0)
+            delay = due - clock()
+            if delay > TICK:
+                if pending:
+                    output.write(b"".join(pending))
+                    output.flush()
+                    pending = []
+                sleep(max(due - clock(), 0))
+            for schedule, cost in schedules:
+                schedule.send(cost(line), available)
+            available = 0
+            pending.append(line)
+
+
+class Counter:
+    "Counts the lines and bytes passing through."
+
+    def __init__(self, blocks):
+        self.blocks = blocks
+        self.count = 0
+        self.bytes = 0
+
+    def __iter__(self):
+        for lines in self.blocks:
+            self.count += len(lines)
+            self.bytes += sum(map(len, lines))
+            yield lines
+
+
+class WriteTimer:
+    "Records when the first and the last writes to output happen."
+
+    def __init__(self, output, clock=time.monotonic):
+        self.output = output
+        self.clock = clock
+        self.first = self.last = None
+
+    def write(self, data):
+        self.output.write(data)
+        self.last = self.clock()
+        if self.first is None:
+            self.first = self.last
+
+    def flush(self):
+        self.output.flush()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("wait", nargs="?", type=float)
+    parser.add_argument("-l", "--lines-per-sec", type=float)
+    parser.add_argument("-b", "--bytes-per-sec", type=parse_rate)
+    parser.add_argument("--burst", type=float, default=0.0)
+    parser.add_argument("--report", action="store_true")
+    return parser.parse_args(argv[1:])
 
 
 def main(argv):
-    if "-h" in argv or "--help" in argv:
-        return __doc__
+    args = parse_args(argv)
 
-    try:
-        wait = float(argv[1])
-    except (IndexError, ValueError):
-        wait = 1.0
+    if args.wait is None and args.lines_per_sec is None and args.bytes_per_sec is None:
+        args.wait = 1.0
+    if args.wait is not None:
+        if args.wait <= 0:
+            return "slower: the wait must be positive"
+        args.lines_per_sec = 1 / args.wait
+    rates = (args.lines_per_sec, args.bytes_per_sec)
+    if any(rate is not None and rate <= 0 for rate in rates):
+        return "slower: rates must be positive"
+
+    start = time.monotonic()
+    schedules = []
+    if args.lines_per_sec:
+        schedule = Schedule(args.lines_per_sec, args.burst, start)
+        schedules.append((schedule, lambda line: 1))
+    if args.bytes_per_sec:
+        schedule = Schedule(args.bytes_per_sec, args.burst, start)
+        schedules.append((schedule, len))
 
+    counter = Counter(read_lines(sys.stdin.buffer))
+    output = WriteTimer(sys.stdout.buffer)
     try:
-        return slower(wait)
+        slower(counter, output, schedules)
     except KeyboardInterrupt:
-        return
+        pass
+
+    if args.report:
+        if output.first is None:
+            elapsed = 0.0
+        else:
+            elapsed = output.last - output.first
+        elapsed = max(elapsed, 1e-9)
+        print(
+            "slower: {} lines, {} bytes in {:.3f}s".format(
+                counter.count, counter.bytes, elapsed
+            ),
+            file=sys.stderr,
+        )
+        if args.lines_per_sec:
+            print(
+                "slower: {:.1f} lines/s (requested {:g})".format(
+                    counter.count / elapsed, args.lines_per_sec
+                ),
+                file=sys.stderr,
+            )
+        if args.bytes_per_sec:
+            print(
+                "slower: {:.1f} bytes/s (requested {:g})".format(
+                    counter.bytes / elapsed, args.bytes_per_sec
+                ),
+                file=sys.stderr,
+            )
 
 
 if __name__ == "__main__":
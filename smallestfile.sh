@@ -7,10 +7,11 @@ Usage: smallestfile [directory]
 
 Prints the smallest file in the specified directory. If a directory is
 not given thenthe current working directory is used.
+
+This is a shortcut for \`topfiles --smallest\`.
 EOF
 	exit 1
 	;;
 esac
 
-dir="${1:-"$(pwd)"}"
-ls --sort=size --reverse "$dir" | head -n1
+exec topfiles --smallest "${1:-.}"
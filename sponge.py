@@ -1,22 +1,112 @@
 #!/usr/bin/env python
-"""Usage: sponge <file>
+"""Usage: sponge [-a] <file>
 
 Collects stdin and waits for it to close before opening the file and
 writing everything it has collected. This is useful when other parts of
 the pipeline are using the file because opening a file blanks it out.
+
+Stdin is collected into a temporary file next to the file, which then
+replaces it in one step, so the file is never left half written. The
+file keeps its permissions and, where possible, its owner. Devices,
+fifos and files in directories that can't be written to are written
+into directly instead. With -a the collected input is appended to the
+file instead of replacing it.
 """
 
+import argparse
+import os
+import shutil
+import stat
 import sys
+import tempfile
+
+BLOCK_SIZE = 1024 * 1024
+# with --append, stdin beyond this size is spooled to disk
+SPOOL_SIZE = 16 * 1024 * 1024
+
+
+def copy_metadata(source, dest):
+    "Gives dest the permissions and owner of source, or the umask default."
+    try:
+        status = os.stat(source)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(dest, 0o666 & ~umask)
+        return
+    os.chmod(dest, status.st_mode & 0o7777)
+    try:
+        os.chown(dest, status.st_uid, status.st_gid)
+    except PermissionError:
+        pass
+
+
+def sponge_in_place(input, filename, append=False):
+    "Collects all of input and then writes it into the file itself."
+    with tempfile.SpooledTemporaryFile(SPOOL_SIZE) as spool:
+        shutil.copyfileobj(input, spool, BLOCK_SIZE)
+        spool.seek(0)
+        with open(filename, "ab" if append else "wb") as file:
+            shutil.copyfileobj(spool, file, BLOCK_SIZE)
+
+
+def sponge(input, filename, append=False):
+    filename = os.path.realpath(filename)
+    directory, name = os.path.split(filename)
+
+    try:
+        mode = os.stat(filename).st_mode
+    except FileNotFoundError:
+        mode = stat.S_IFREG
+    if not stat.S_ISREG(mode) or not os.access(directory, os.W_OK):
+        sponge_in_place(input, filename, append)
+        return
+
+    if append:
+        spool = tempfile.SpooledTemporaryFile(SPOOL_SIZE, dir=directory)
+        shutil.copyfileobj(input, spool, BLOCK_SIZE)
+        spool.seek(0)
+        input = spool
+
+    temp = tempfile.NamedTemporaryFile(
+        dir=directory, prefix="." + name + ".", delete=False
+    )
+    try:
+        with temp:
+            if append:
+                try:
+                    with open(filename, "rb") as original:
+                        shutil.copyfileobj(original, temp, BLOCK_SIZE)
+                except FileNotFoundError:
+                    pass
+            shutil.copyfileobj(input, temp, BLOCK_SIZE)
+            if append:
+                input.close()
+            temp.flush()
+            os.fsync(temp.fileno())
+        copy_metadata(filename, temp.name)
+        os.replace(temp.name, filename)
+    except BaseException:
+        os.unlink(temp.name)
+        raise
+
+    dirfd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dirfd)
+    finally:
+        os.close(dirfd)
 
 
 def main(argv):
     if not argv[1:] or "-h" in argv or "--help" in argv:
         return __doc__
 
-    output = [line for line in sys.stdin.buffer]
-    with open(argv[1], "wb") as file:
-        for bytes in output:
-            file.write(bytes)
+    parser = argparse.ArgumentParser(usage=__doc__)
+    parser.add_argument("-a", "--append", action="store_true")
+    parser.add_argument("file")
+    args = parser.parse_args(argv[1:])
+
+    sponge(sys.stdin.buffer, args.file, args.append)
 
 
 if __name__ == "__main__":
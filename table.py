@@ -1,10 +1,27 @@
 #!/usr/bin/env python
-"""A filter that aligns the columns in stdin."""
+"""A filter that aligns the columns in stdin, or in the files given.
+
+The input is read twice, once to find the column widths and once to print
+it, so files are mapped into memory rather than read and big inputs on
+stdin are spooled to a temporary file. With --sample only the first N rows
+are used to find the widths and everything is then streamed.
+
+Widths are measured in terminal columns, so wide characters such as CJK
+and emoji stay aligned."""
 
 import argparse
+import functools
+import io
 import itertools
+import mmap
 import os
+import shutil
 import sys
+import tempfile
+import unicodedata
+
+# stdin bigger than this is spooled to a temporary file
+SPOOL_THRESHOLD = 64 * 1024 * 1024
 
 
 def make_padding(pad, sep):
@@ -14,9 +31,9 @@ def make_padding(pad, sep):
         return " " * pad + sep + " " * pad
 
 
-def tabulate(text, sep, join):
-    for textline in text.splitlines():
-        cells = textline.split(sep)
+def tabulate(lines, sep, join):
+    for textline in lines:
+        cells = textline.rstrip("\r\n").split(sep)
         if len(cells) < 1:
             yield [textline.strip()]
         else:
@@ -26,29 +43,127 @@ def tabulate(text, sep, join):
                 yield [cell.strip() for cell in cells]
 
 
-def print_table(table, widths, pad):
+@functools.lru_cache(maxsize=65536)
+def wide_width(text):
+    "Counts the terminal columns taken by a non-ascii string."
+    width = 0
+    for char in text:
+        if unicodedata.category(char) in ("Mn", "Me", "Cf"):
+            continue
+        width += 2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
+    return width
+
+
+def display_width(text):
+    return len(text) if text.isascii() else wide_width(text)
+
+
+def make_formats(widths, pad):
+    "Makes a format string for rows of each length up to len(widths)."
+    columns = ["{:<%d}" % width for width in widths]
+    # the padding is user supplied, so it mustn't be read as a field
+    pad = pad.replace("{", "{{").replace("}", "}}")
+    return [pad.join(columns[:n]) for n in range(len(widths) + 1)]
+
+
+def render_row(row, widths, formats, pad):
+    cells = row[: len(widths)]
+    if all(map(str.isascii, cells)):
+        line = formats[len(cells)].format(*cells)
+    else:
+        line = pad.join(
+            cell.ljust(width + len(cell) - display_width(cell))
+            for width, cell in zip(widths, cells)
+        )
+    if len(row) > len(widths):
+        line = pad.join([line, *row[len(widths) :]]) if cells else pad.join(row)
+    return line.strip()
+
+
+def print_table(table, widths, pad, rows_per_write=8192):
+    formats = make_formats(widths, pad)
+    write = sys.stdout.write
+    while True:
+        block = [
+            render_row(row, widths, formats, pad)
+            for row in itertools.islice(table, rows_per_write)
+        ]
+        if not block:
+            break
+        block.append("")
+        write("\n".join(block))
+
+
+def column_widths(table):
+    widths = []
     for row in table:
-        out = []
-        for width, cell in zip(widths, row):
-            out.append(cell.ljust(width))
-        print(pad.join(out).strip())
+        for column, width in enumerate(map(display_width, row)):
+            if column >= len(widths):
+                widths.append(width)
+            elif width > widths[column]:
+                widths[column] = width
+    if widths:
+        widths[-1] = 0
+    return widths
+
+
+def map_file(file):
+    "Maps a binary file into memory."
+    if os.fstat(file.fileno()).st_size == 0:
+        return io.BytesIO()
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def spool(file, threshold=SPOOL_THRESHOLD):
+    "Reads a binary file into memory, or into a temporary file if it's big."
+    data = file.read(threshold)
+    if len(data) < threshold:
+        return io.BytesIO(data)
+    with tempfile.TemporaryFile() as temp:
+        temp.write(data)
+        shutil.copyfileobj(file, temp)
+        temp.flush()
+        return map_file(temp)
+
+
+def read_lines(sources):
+    "Yields decoded lines from the start of each source."
+    for source in sources:
+        source.seek(0)
+        for line in iter(source.readline, b""):
+            yield line.decode()
 
 
 def main(argv):
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("-p", "--padding", default=1)
+    parser.add_argument("-p", "--padding", type=int, default=1)
     parser.add_argument("-s", "--separator", default=None)
     parser.add_argument("-j", "--join-empty", action="store_true")
+    parser.add_argument("--sample", type=int, metavar="N")
+    parser.add_argument("files", nargs="*")
     args = parser.parse_args(argv[1:])
 
-    data = sys.stdin.read()
-    table = list(tabulate(data, args.separator, args.join_empty))
     pad = make_padding(args.padding, args.separator)
-    widths = [
-        max([len(cell) for cell in col])
-        for col in itertools.zip_longest(*table, fillvalue="")
-    ]
-    widths[-1] = 0
+
+    if args.sample is not None:
+        files = [open(name, "rb") for name in args.files] or [sys.stdin.buffer]
+        lines = (line.decode() for file in files for line in file)
+        table = tabulate(lines, args.separator, args.join_empty)
+        head = list(itertools.islice(table, args.sample))
+        widths = column_widths(head)
+        print_table(itertools.chain(head, table), widths, pad)
+        return
+
+    sources = []
+    for name in args.files:
+        with open(name, "rb") as file:
+            sources.append(map_file(file))
+    if not args.files:
+        sources.append(spool(sys.stdin.buffer))
+
+    table = tabulate(read_lines(sources), args.separator, args.join_empty)
+    widths = column_widths(table)
+    table = tabulate(read_lines(sources), args.separator, args.join_empty)
     print_table(table, widths, pad)
 
 
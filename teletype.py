@@ -1,10 +1,15 @@
 #!/usr/bin/env python
-"""Usage: teletype
+"""Usage: teletype [-s SPEED] [--replay TIMING TYPESCRIPT]
 
 A filter that outputs stdin one charactor at a time to simulate someone
 typing at an old teletype machine.
+
+With --replay it instead plays back a terminal session recorded by
+`script --timing=TIMING TYPESCRIPT`, with the same pacing as the
+original. SPEED makes either of them faster (or slower, if below 1).
 """
 
+import argparse
 import sys
 import time
 
@@ -20,14 +25,104 @@ timings = {
     "!": 0.4,
 }
 
+# output due within this many seconds of each other is written together
+TICK = 0.01
 
-def main(argv):
-    for line in sys.stdin:
+
+class Pacer:
+    "Writes chunks of output at absolute deadlines on a monotonic clock."
+
+    def __init__(self, output, clock=time.monotonic, sleep=time.sleep):
+        self.output = output
+        self.clock = clock
+        self.sleep = sleep
+        self.deadline = clock()
+        self.pending = []
+
+    def flush(self):
+        if self.pending:
+            self.output.write(type(self.pending[0])().join(self.pending))
+            self.output.flush()
+            self.pending = []
+
+    def write(self, chunk):
+        "Writes chunk at the current deadline, coalescing with earlier ones."
+        delay = self.deadline - self.clock()
+        if delay > TICK:
+            self.flush()
+            self.sleep(delay)
+        self.pending.append(chunk)
+
+    def wait(self, seconds):
+        self.deadline += seconds
+
+    def resume(self):
+        "Starts pacing from now again after the input stalled."
+        self.deadline = max(self.deadline, self.clock())
+
+
+def teletype(input, pacer, speed=1.0):
+    lines = iter(input)
+    while True:
+        # write everything out before the next line, which might not come soon
+        pacer.flush()
+        before = pacer.clock()
+        line = next(lines, None)
+        if line is None:
+            break
+        if pacer.clock() - before > TICK:
+            pacer.resume()
         for char in line:
-            sys.stdout.write(char)
-            sys.stdout.flush()
+            pacer.write(char)
+            pacer.wait(timings.get(char, default) * 0.5 / speed)
+
+
+def replay(timing, typescript, pacer, speed=1.0):
+    """Plays back a typescript using the timings recorded by `script`.
+
+    Understands both the classic `<delay> <bytes>` timing lines and the
+    advanced `<type> <delay> <bytes>` ones, of which only output (O)
+    entries are played back."""
+    header = typescript.readline()
+    if not header.startswith(b"Script started"):
+        pacer.write(header)
+
+    for entry in timing:
+        fields = entry.split()
+        if len(fields) == 2:
+            delay, size = fields
+        elif len(fields) >= 3 and fields[0] in ("O", "I", "S", "H"):
+            kind, delay, size = fields[:3]
+            if kind != "O":
+                pacer.wait(float(delay) / speed)
+                continue
+        else:
+            continue
+        pacer.wait(float(delay) / speed)
+        pacer.write(typescript.read(int(size)))
+    pacer.flush()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("-s", "--speed", type=float, default=1.0)
+    parser.add_argument("--replay", nargs=2, metavar=("TIMING", "TYPESCRIPT"))
+    return parser.parse_args(argv[1:])
+
+
+def main(argv):
+    args = parse_args(argv)
+    if args.speed <= 0:
+        return "teletype: the speed must be positive"
 
-            time.sleep(timings.get(char, default) * 0.5)
+    if args.replay:
+        timing_file, typescript_file = args.replay
+        with open(timing_file) as timing, open(typescript_file, "rb") as typescript:
+            replay(timing, typescript, Pacer(sys.stdout.buffer), args.speed)
+    else:
+        teletype(sys.stdin, Pacer(sys.stdout), args.speed)
 
 
 if __name__ == "__main__":
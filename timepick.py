@@ -1,16 +1,34 @@
 #!/usr/bin/env python
-"""Usage: timepick [second|minute|hour|day|week]
+"""Usage: timepick [-i] [second|minute|hour|day|week] [file]
 
-A filter that picks a single line from stdin based on the current time.
+A filter that picks a single line from stdin (or the file) based on the
+current time.
 
 This has an advantage over random selection in that it's cyclical and
 thus no clustering or repetition of the selections; seems 'more random'
 to people.
+
+The input is never read into memory; it is mapped and its newlines are
+counted, so picking from huge files is cheap. With -i an index of where
+the lines are is kept in `~/.cache/timepick`, so picking from the same
+file again doesn't need to count its lines at all as long as the file
+hasn't changed.
 """
 
+import array
+import bisect
+import datetime
+import hashlib
+import itertools
+import mmap
 import os
+import pathlib
+import shutil
 import sys
-import datetime
+import tempfile
+
+# newlines are counted per block; the index holds one count per block
+BLOCK_SIZE = 64 * 1024
 
 pdict = {
     "second": lambda a: (a.days * 24 * 60 * 60) + a.seconds,
@@ -26,29 +44,111 @@ def numSinceEpoch(period):
     return abs(int(pdict[period](td)))
 
 
+def xdg_cache_dir(name):
+    default = pathlib.Path("~/.cache").expanduser()
+    base = pathlib.Path(os.environ.get("XDG_CACHE_HOME", default))
+    fname = base / name
+    if not fname.exists():
+        fname.mkdir(parents=True)
+    return fname
+
+
+def map_file(file):
+    "Maps a binary file into memory."
+    if os.fstat(file.fileno()).st_size == 0:
+        return b""
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def build_index(content):
+    "Returns the number of newlines before the start of each block."
+    counts = (
+        content[start : start + BLOCK_SIZE].count(b"\n")
+        for start in range(0, len(content), BLOCK_SIZE)
+    )
+    return array.array("Q", itertools.accumulate(counts, initial=0))
+
+
+def cached_index(filename, content):
+    "Like build_index, but keeps the index in a cache keyed on the file."
+    stat = os.stat(filename)
+    key = hashlib.sha256(os.fsencode(os.path.realpath(filename))).hexdigest()
+    cache = xdg_cache_dir("timepick") / key
+    header = array.array("Q", [stat.st_size, stat.st_mtime_ns])
+    try:
+        with open(cache, "rb") as file:
+            cached = array.array("Q", file.read())
+        if cached[:2] == header:
+            return cached[2:]
+    except (OSError, ValueError):
+        pass
+
+    index = build_index(content)
+    with tempfile.NamedTemporaryFile(dir=cache.parent, delete=False) as file:
+        file.write((header + index).tobytes())
+    os.replace(file.name, cache)
+    return index
+
+
+def count_lines(content, index):
+    count = index[-1]
+    if content[-1:] not in (b"", b"\n"):
+        count += 1
+    return count
+
+
+def get_line(content, index, lineno):
+    "Finds a line by skipping straight to the block holding its start."
+    start = 0
+    if lineno:
+        # the block holding the newline just before the line
+        block = bisect.bisect_left(index, lineno) - 1
+        start = block * BLOCK_SIZE
+        for _ in range(lineno - index[block]):
+            start = content.find(b"\n", start) + 1
+    end = content.find(b"\n", start)
+    return content[start : end if end != -1 else len(content)]
+
+
 def main(argv):
     if not argv[1:] or "-h" in argv or "--help" in argv:
         return __doc__
 
+    use_index = "-i" in argv or "--index" in argv
+    args = [arg for arg in argv[1:] if arg not in ("-i", "--index")]
+
     try:
-        div = argv[1]
+        div = args[0]
         if div.endswith("s"):
             div = div[:-1]
     except IndexError:
         div = object()
 
     if div not in pdict:
-        return "usage: {0} [{1}]".format(
+        return "usage: {0} [-i] [{1}] [file]".format(
             os.path.basename(argv[0]), "|".join(sorted(pdict.keys()))
         )
 
-    choices = sys.stdin.readlines()
+    if args[1:]:
+        with open(args[1], "rb") as file:
+            content = map_file(file)
+        if use_index:
+            index = cached_index(args[1], content)
+        else:
+            index = build_index(content)
+    else:
+        with tempfile.TemporaryFile() as file:
+            shutil.copyfileobj(sys.stdin.buffer, file)
+            file.flush()
+            content = map_file(file)
+        index = build_index(content)
+
     try:
-        lineno = numSinceEpoch(div) % len(choices)
+        lineno = numSinceEpoch(div) % count_lines(content, index)
     except ZeroDivisionError:
         pass
     else:
-        choice = choices[lineno].strip()
+        choice = get_line(content, index, lineno).decode().strip()
         print(choice)
 
 
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""Usage: topfiles [--oldest|--newest|--smallest|--largest] [-t atime|mtime]
+                [-n COUNT] [-r] [-a] [-0] [-j N] [directory]
+
+Prints the oldest, newest, smallest or largest entries in a directory
+(the cwd by default), best first. Only COUNT entries (default 1) are
+ever kept in memory, so huge directories don't need to be sorted.
+
+Age is judged by the modification time unless -t atime is given. Names
+starting with a dot are skipped like `ls` does, unless -a is given. With
+-r the directory is searched recursively, using N threads, and only
+files are considered; their paths are printed relative to the
+directory. With -0 the names are separated by NUL instead of newlines.
+"""
+
+import argparse
+import concurrent.futures
+import heapq
+import itertools
+import os
+import sys
+
+ORDERS = {
+    # name: (stat attribute, whether bigger values win)
+    "oldest": (None, False),
+    "newest": (None, True),
+    "smallest": ("st_size", False),
+    "largest": ("st_size", True),
+}
+
+
+class TopK:
+    "A bounded heap holding the count best items seen so far."
+
+    def __init__(self, count, biggest):
+        self.count = count
+        self.sign = 1 if biggest else -1
+        self.heap = []
+        self.tiebreak = itertools.count()
+
+    def push(self, key, item):
+        entry = (self.sign * key, -next(self.tiebreak), item)
+        if len(self.heap) < self.count:
+            heapq.heappush(self.heap, entry)
+        elif entry > self.heap[0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def best(self):
+        return [item for _, _, item in sorted(self.heap, reverse=True)]
+
+
+def scan(path, attribute, hidden, recursive):
+    "Returns the (key, path) of the entries in path and its subdirectories."
+    found = []
+    subdirs = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if not hidden and entry.name.startswith("."):
+                    continue
+                try:
+                    if recursive and entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                found.append((getattr(stat, attribute), entry.path))
+    except OSError as error:
+        print("topfiles: {}: {}".format(path, error.strerror), file=sys.stderr)
+    return found, subdirs
+
+
+def top_entries(root, attribute, top, hidden=False, recursive=False, jobs=8):
+    with concurrent.futures.ThreadPoolExecutor(jobs) as executor:
+        pending = {executor.submit(scan, root, attribute, hidden, recursive)}
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for job in done:
+                found, subdirs = job.result()
+                for key, path in found:
+                    top.push(key, path)
+                pending.update(
+                    executor.submit(scan, subdir, attribute, hidden, recursive)
+                    for subdir in subdirs
+                )
+    return top.best()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    order = parser.add_mutually_exclusive_group()
+    for name in ORDERS:
+        order.add_argument("--" + name, dest="order", action="store_const", const=name)
+    parser.add_argument("-t", "--time", choices=("atime", "mtime"), default="mtime")
+    parser.add_argument("-n", "--count", type=int, default=1)
+    parser.add_argument("-r", "--recursive", action="store_true")
+    parser.add_argument("-a", "--all", action="store_true")
+    parser.add_argument("-0", "--null", action="store_true")
+    parser.add_argument("-j", "--jobs", type=int, default=8)
+    parser.add_argument("directory", nargs="?", default=".")
+    parser.set_defaults(order="oldest")
+    return parser.parse_args(argv[1:])
+
+
+def main(argv):
+    args = parse_args(argv)
+    if args.count < 1:
+        return "topfiles: the count must be at least 1"
+    if not os.path.isdir(args.directory):
+        return "topfiles: {}: not a directory".format(args.directory)
+
+    attribute, biggest = ORDERS[args.order]
+    if attribute is None:
+        attribute = "st_" + args.time + "_ns"
+
+    top = TopK(args.count, biggest)
+    paths = top_entries(
+        args.directory, attribute, top, args.all, args.recursive, max(args.jobs, 1)
+    )
+    end = "\0" if args.null else "\n"
+    for path in paths:
+        name = os.path.relpath(path, args.directory)
+        sys.stdout.write(name + end)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
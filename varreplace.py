@@ -1,51 +1,102 @@
 #!/usr/bin/env python
-"""Usage: varreplace (--env|[VARIABLE=VALUE]...)
+"""Usage: varreplace [--strict] (--env|[VARIABLE=VALUE]...)
 
 Replaces variables in stdin with their values. Many variables can be given
 on the command line in the same format as expected by `export`, or you
 can use the --env flag to use variables from the environment. Variables
 in stdin are strings like $var or ${var}.
 
+A default can be given as ${var:-default}, which is used when the
+variable is unknown or empty. Unknown variables without a default are
+left alone, unless --strict is given, in which case they are an error.
+
 Example:
     $ echo 'Praise be to ${DIETY}.' | varreplace DIETY=Iluvatar
     Praise be to Iluvatar.
     $ echo 'Display number: "$DISPLAY"' | varreplace --env
     Display number: ":0"
     $ echo 'Display number: "$DISPLAY"' | varreplace DISPLAY
-    Display number: ":0" """
+    Display number: ":0"
+    $ echo '${GREETING:-Hello} $NAME' | varreplace NAME=world
+    Hello world"""
 
 import os
+import re
 import sys
 
+BLOCK_SIZE = 1024 * 1024
+
+regex = re.compile(
+    rb"\$(?:(?P<name>[A-Za-z_][A-Za-z0-9_]*)"
+    rb"|\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)(?::-(?P<default>[^}\n]*))?\})"
+)
+
+
+class UndefinedVariable(Exception):
+    pass
+
 
 def parse_args(argv):
     if "--env" in argv:
-        yield from dict(os.environ).items()
+        yield from dict(os.environb).items()
         return
     for var in argv[1:]:
+        if var == "--strict":
+            continue
         if "=" in var:
             key, __, value = var.partition("=")
-            yield key, value
+            yield os.fsencode(key), os.fsencode(value)
         else:
-            yield var, os.environ.get(var, "")
+            yield os.fsencode(var), os.environb.get(os.fsencode(var), b"")
+
+
+def make_replacer(replacements, strict=False):
+    "Makes a function that replaces a variable match with its value."
+
+    def replace(match):
+        value = replacements.get(match["name"] or match["braced"])
+        default = match["default"]
+        if default is not None and not value:
+            return default
+        if value is None:
+            if strict:
+                raise UndefinedVariable(match[0].decode(errors="replace"))
+            return match[0]
+        return value
+
+    return replace
+
 
+def blocks(file):
+    """Yields blocks of a binary file that each end at a line break.
 
-def variable_variants(var):
-    yield "$" + var
-    yield "${" + var + "}"
+    Each read returns whatever is available, up to a big block, so input
+    typed or piped in slowly is passed on line by line."""
+    rest = b""
+    for block in iter(lambda: file.read1(BLOCK_SIZE), b""):
+        end = block.rfind(b"\n") + 1
+        if end == 0:
+            rest += block
+            continue
+        yield rest + block[:end]
+        rest = block[end:]
+    if rest:
+        yield rest
 
 
 def main(argv):
     if not argv[1:] or "-h" in argv or "--help" in argv:
         return __doc__
 
-    replacements = dict(parse_args(argv))
+    replace = make_replacer(dict(parse_args(argv)), strict="--strict" in argv)
 
-    for line in sys.stdin:
-        for name, value in replacements.items():
-            for variant in variable_variants(name):
-                line = line.replace(variant, value)
-        sys.stdout.write(line)
+    output = sys.stdout.buffer
+    for block in blocks(sys.stdin.buffer):
+        try:
+            output.write(regex.sub(replace, block))
+            output.flush()
+        except UndefinedVariable as error:
+            return "varreplace: {} is not defined".format(error)
 
 
 if __name__ == "__main__":